@@ -0,0 +1,205 @@
+"""Timings of the app's hot paths on a synthetic database.
+
+Runs every benchmark on data from synthetic_db and writes the results as
+JSON, so two versions can be compared run against run:
+
+    python benchmark.py --rows 5000 --io-sheets 60 --out before.json
+    ... change something ...
+    python benchmark.py --rows 5000 --io-sheets 60 --out after.json --compare before.json
+
+Each benchmark runs ``--repeat`` times after one warm-up run; the JSON holds
+min / median / mean / max seconds per benchmark plus the settings used. The
+upload and load benchmarks use in-memory SQLite backends, so no Google
+account or network is involved.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import gsheet_helper
+from export_helper import available_formats, export_bytes, sanitize_df_for_excel
+from frame_helper import AreaIndex, clean_df, find_area_column
+from mopr_helper import prepare_mopr, star_html, star_layout
+from search_helper import RowIndex, build_haystack, search_indexes, search_rows
+from sheet_backends import SQLiteBackend
+from synthetic_db import DASHBOARD_SHEETS, make_database
+
+QUERIES = ["motor", "siemens", "pump trip", "2250", "zz-no-match"]
+
+
+def _time(fn, repeat):
+    fn()  # warm-up: imports, caches, first-call allocations
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return {
+        "runs": repeat,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+        "max": max(runs),
+    }
+
+
+def benchmarks(frames):
+    """{name: zero-argument callable} for every benchmark on ``frames``."""
+    dashboard = {name: frames[name] for name in DASHBOARD_SHEETS}
+    clean = {name: clean_df(df) for name, df in frames.items()}
+    big = clean["PLC DETAILS"]
+    haystack = build_haystack(big)
+    area_index = AreaIndex(big)
+    row_indexes = {
+        name: RowIndex(df, find_area_column(df),
+                       gsheet_helper.parse_io_title(name)[0] if name.startswith("IO_") else "(No Area)")
+        for name, df in clean.items()
+    }
+    mopr = prepare_mopr(clean["MOPR"])
+    # star diagrams from the sheet's own departments up to a few hundred
+    star_rows = mopr.departments() + [(f"Department {i}", f"https://docs.example.com/ppt/{i}")
+                                      for i in range(400)]
+
+    def clean_dashboard():
+        for df in dashboard.values():
+            clean_df(df)
+
+    def search_one_sheet():
+        for query in QUERIES:
+            search_rows(big, query, haystack)
+
+    def search_all_sheets():
+        for query in QUERIES:
+            search_indexes(row_indexes, query)
+
+    def area_filter():
+        for area in area_index.areas:
+            area_index.rows(big, area)
+
+    def export(fmt):
+        def run():
+            for df in clean.values():
+                export_bytes(df, fmt, sheet_title="Export")
+        return run
+
+    def upload():
+        gsheet_helper.set_backend(SQLiteBackend(":memory:"))
+        report = gsheet_helper.upload_sheets(dashboard)
+        failed = [name for name, res in report.items() if res["error"]]
+        if failed:
+            raise RuntimeError(f"upload failed for {failed}")
+
+    # a store of its own for the load benchmark, so it can run without upload
+    store = SQLiteBackend(":memory:")
+    for name, df in dashboard.items():
+        df = gsheet_helper.with_row_ids(df)
+        store.write_sheet(name, [[str(c) for c in df.columns]] + df.astype(str).values.tolist())
+
+    def load():
+        gsheet_helper.set_backend(store)  # also empties the sheet cache
+        gsheet_helper.load_sheets_from_db(list(dashboard))
+
+    cases = {
+        "clean_df": clean_dashboard,
+        "search_haystack_build": lambda: build_haystack(big),
+        "search_one_sheet": search_one_sheet,
+        "search_index_build": lambda: [RowIndex(df, find_area_column(df)) for df in clean.values()],
+        "search_all_sheets": search_all_sheets,
+        "area_index_build": lambda: AreaIndex(big),
+        "area_filter": area_filter,
+        "sanitize_for_excel": lambda: [sanitize_df_for_excel(df) for df in clean.values()],
+        "mopr_prepare": lambda: prepare_mopr(clean["MOPR"]),
+        "mopr_filter": lambda: [mopr.departments(fy) for fy in ["All"] + mopr.fy_options],
+        "mopr_layout": lambda: [star_layout(n) for n in range(0, 401, 25)],
+        "mopr_render": lambda: [star_html(star_rows[:n]) for n in range(0, 401, 25)],
+        "upload": upload,
+        "load_sheets": load,
+    }
+    for fmt in available_formats():
+        cases[f"export_{fmt}"] = export(fmt)
+    return cases
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             timeout=5, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(rows=2500, io_sheets=40, io_rows=400, mopr_rows=240, repeat=5, seed=0, only=None):
+    """Run the benchmarks (or just those named in ``only``) and return the report dict."""
+    frames = make_database(rows, io_sheets, io_rows, mopr_rows, seed)
+    cases = benchmarks(frames)
+    if only:
+        unknown = set(only) - set(cases)
+        if unknown:
+            raise SystemExit(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        cases = {name: cases[name] for name in only}
+    results = {}
+    for name, fn in cases.items():
+        results[name] = _time(fn, repeat)
+        print(f"{name:<24} {results[name]['median'] * 1000:9.1f} ms", file=sys.stderr)
+    return {
+        "settings": {"rows": rows, "io_sheets": io_sheets, "io_rows": io_rows, "mopr_rows": mopr_rows,
+                     "repeat": repeat, "seed": seed},
+        "environment": {"python": platform.python_version(), "pandas": pd.__version__,
+                        "numpy": np.__version__, "platform": platform.platform(),
+                        "revision": _git_revision()},
+        "sheets": len(frames),
+        "cells": int(sum(df.size for df in frames.values())),
+        "results": results,
+    }
+
+
+def compare(report, baseline):
+    """Lines comparing median times of ``report`` against ``baseline``."""
+    lines = []
+    for name, res in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            lines.append(f"{name:<24} {res['median'] * 1000:9.1f} ms   (new)")
+            continue
+        ratio = res["median"] / old["median"] if old["median"] else float("inf")
+        lines.append(f"{name:<24} {old['median'] * 1000:9.1f} -> {res['median'] * 1000:9.1f} ms   x{ratio:.2f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths on a synthetic database.")
+    parser.add_argument("--rows", type=int, default=2500, help="rows of the largest dashboard sheet")
+    parser.add_argument("--io-sheets", type=int, default=40)
+    parser.add_argument("--io-rows", type=int, default=400)
+    parser.add_argument("--mopr-rows", type=int, default=240)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run just these benchmarks")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="JSON", help="earlier report to compare medians against")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, args.io_sheets, args.io_rows, args.mopr_rows, args.repeat, args.seed, args.only)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        print("\n".join(compare(report, baseline)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
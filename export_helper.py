@@ -0,0 +1,193 @@
+"""Streaming export of sheet frames to xlsx, CSV and Parquet.
+
+Rows are written one at a time (or in small chunks for Parquet) and
+sanitized on the way out, so an export never holds a second, cleaned copy
+of the frame. The xlsx writer uses openpyxl's write-only mode, which keeps
+just the current row in memory. Output goes to a spooled temp file that
+moves to disk once it gets large.
+"""
+import csv
+import io
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# --- Fix for Excel export: strip illegal XML/control chars ---
+_ILLEGAL_CTRL = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F]')
+
+_PARQUET_CHUNK_ROWS = 5000
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def sanitize_excel_str(v):
+    s = "" if v is None else str(v)
+    s = (s.replace("\u00A0", " ")  # NBSP -> space
+         .replace("\uFEFF", "")    # BOM
+         .replace("\u200B", "")    # zero-width space
+         .replace("\u200C", "")    # ZWNJ
+         .replace("\u200D", "")    # ZWJ
+         .replace("\u2060", ""))   # word joiner
+    s = _ILLEGAL_CTRL.sub("", s)   # remove ASCII control chars Excel disallows
+    return s
+
+
+def sanitize_df_for_excel(df: pd.DataFrame) -> pd.DataFrame:
+    """Element-wise sanitized copy of ``df`` (the streaming writers don't need it)."""
+    if hasattr(df, "map"):          # pandas >= 2.1
+        return df.map(sanitize_excel_str)
+    return df.applymap(sanitize_excel_str)   # purane pandas ke liye
+
+
+def iter_sanitized_rows(df):
+    """Yield the header and then every row of ``df`` as sanitized string lists."""
+    yield [sanitize_excel_str(c) for c in df.columns]
+    for row in df.itertuples(index=False, name=None):
+        yield [sanitize_excel_str(v) for v in row]
+
+
+_XLSX_TITLE_BAD = re.compile(r'[\[\]:*?/\\]')
+
+
+def _xlsx_title(name, used):
+    """Excel-safe, unique worksheet title (max 31 chars, no []:*?/\\)."""
+    base = _XLSX_TITLE_BAD.sub("_", sanitize_excel_str(name)).strip("'")[:31] or "Sheet"
+    title, n = base, 1
+    while title.lower() in used:
+        n += 1
+        suffix = f"~{n}"
+        title = base[:31 - len(suffix)] + suffix
+    used.add(title.lower())
+    return title
+
+
+def _append_xlsx_sheet(wb, title, df):
+    ws = wb.create_sheet(title=title)
+    for row in iter_sanitized_rows(df):
+        ws.append(row)
+
+
+def write_xlsx(df, fileobj, sheet_title="Export"):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    _append_xlsx_sheet(wb, _xlsx_title(sheet_title, set()), df)
+    wb.save(fileobj)
+
+
+def write_csv(df, fileobj, sheet_title=None):
+    # utf-8-sig so Excel opens non-ASCII text correctly
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow([str(c) for c in df.columns])
+    for row in df.itertuples(index=False, name=None):
+        writer.writerow(["" if v is None else str(v) for v in row])
+    text.flush()
+    text.detach()
+
+
+def write_parquet(df, fileobj, sheet_title=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = [str(c) for c in df.columns]
+    schema = pa.schema([(name, pa.string()) for name in names])
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for start in range(0, len(df), _PARQUET_CHUNK_ROWS):
+            chunk = df.iloc[start:start + _PARQUET_CHUNK_ROWS]
+            arrays = [pa.array(chunk.iloc[:, i].astype(str).tolist(), type=pa.string())
+                      for i in range(chunk.shape[1])]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        if len(df) == 0:
+            writer.write_table(schema.empty_table())
+
+
+# format -> (file extension, mime type, writer)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx),
+    "csv": ("csv", "text/csv", write_csv),
+    "parquet": ("parquet", "application/vnd.apache.parquet", write_parquet),
+}
+
+
+def available_formats():
+    """Export formats usable here (Parquet needs pyarrow)."""
+    formats = ["xlsx", "csv"]
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return formats
+    return formats + ["parquet"]
+
+
+def export_to_file(df, fmt, fileobj, sheet_title="Export"):
+    """Stream ``df`` into ``fileobj`` in the given format."""
+    EXPORT_FORMATS[fmt][2](df, fileobj, sheet_title=sheet_title)
+
+
+def export_bytes(df, fmt, sheet_title="Export"):
+    """Export ``df`` and return the file contents as bytes."""
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES) as tmp:
+        export_to_file(df, fmt, tmp, sheet_title=sheet_title)
+        tmp.seek(0)
+        return tmp.read()
+
+
+def export_all_sheets(sheet_names, load_sheets, fmt="xlsx", as_zip=False,
+                      progress=None, max_workers=4, batch_size=8):
+    """Export many sheets into one file and return its bytes.
+
+    Sheets are fetched in batches of ``batch_size`` on a thread pool through
+    ``load_sheets`` (a callable taking a list of names and returning
+    {name: DataFrame}, e.g. gsheet_helper.load_sheets_from_db, which serves
+    still-fresh sheets from its cache). With ``as_zip`` every sheet becomes
+    its own ``fmt`` file inside a zip and is serialized on the pool too;
+    otherwise all sheets land in one multi-sheet xlsx workbook, written in
+    the order given. Empty sheets are left out. ``progress(done, total,
+    sheet_name)`` is called from the calling thread after each sheet.
+    """
+    names = list(dict.fromkeys(sheet_names))
+    groups = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+    total, done = len(names), 0
+
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES) as tmp, \
+            ThreadPoolExecutor(max_workers=max_workers) as pool:
+        if as_zip:
+            ext = EXPORT_FORMATS[fmt][0]
+
+            def fetch_and_export(group):
+                frames = load_sheets(group)
+                return [(name, export_bytes(frames[name], fmt, sheet_title=name) if not frames[name].empty else None)
+                        for name in group]
+
+            with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                used = set()
+                for future in [pool.submit(fetch_and_export, group) for group in groups]:
+                    for name, data in future.result():
+                        if data is not None:
+                            zf.writestr(f"{_xlsx_title(name, used)}.{ext}", data)
+                        done += 1
+                        if progress:
+                            progress(done, total, name)
+        else:
+            from openpyxl import Workbook
+
+            wb = Workbook(write_only=True)
+            used = set()
+            futures = [pool.submit(load_sheets, group) for group in groups]
+            for group, future in zip(groups, futures):
+                frames = future.result()
+                for name in group:
+                    if not frames[name].empty:
+                        _append_xlsx_sheet(wb, _xlsx_title(name, used), frames[name])
+                    done += 1
+                    if progress:
+                        progress(done, total, name)
+            if not used:
+                wb.create_sheet(title="Empty")
+            wb.save(tmp)
+
+        tmp.seek(0)
+        return tmp.read()
@@ -0,0 +1,322 @@
+"""In-process stand-in for the Google Sheets API, as seen through gspread.
+
+FakeSheetsService plays the gspread client: ``open(name)`` returns a
+FakeSpreadsheet, and spreadsheets and worksheets implement the calls
+GoogleSheetsBackend makes (worksheet, worksheets, add_worksheet,
+values_get, values_batch_get, values_batch_update, get_lastUpdateTime,
+get_all_values, clear, append_row(s), hide, update and batch_update).
+Plug it into the app with
+
+    backend = GoogleSheetsBackend(FakeSheetsService(latency=0.2), SHEET_NAME)
+    gsheet_helper.set_backend(backend)
+
+Every call sleeps for a configurable latency, counts against per-minute
+read and write quotas shared by all callers (a 429 APIError when one is
+used up, like the real API), and can be made to fail on purpose: randomly
+at ``failure_rate`` or deterministically with inject_failures(). stats()
+reports what happened.
+"""
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import gspread
+from gspread.utils import a1_range_to_grid_range
+
+READ_CALLS = {"open", "worksheet", "worksheets", "values_get", "values_batch_get",
+              "get_lastUpdateTime", "get_all_values"}
+
+
+class _Response:
+    """Just enough of a requests.Response for gspread.exceptions.APIError."""
+
+    def __init__(self, code, message, status):
+        self.status_code = code
+        self.text = message
+        self._error = {"code": code, "message": message, "status": status}
+
+    def json(self):
+        return {"error": self._error}
+
+
+def api_error(code, message, status="UNAVAILABLE"):
+    """A gspread APIError carrying HTTP status ``code``."""
+    return gspread.exceptions.APIError(_Response(code, message, status))
+
+
+def split_range(range_name):
+    """("Sheet title", "A1 part or None") from an absolute range like "'My sheet'!A1:B2"."""
+    if range_name.startswith("'"):
+        i = 1
+        while True:
+            i = range_name.index("'", i)
+            if range_name[i + 1:i + 2] == "'":
+                i += 2
+                continue
+            break
+        title = range_name[1:i].replace("''", "'")
+        rest = range_name[i + 1:]
+        return title, rest[1:] if rest.startswith("!") else None
+    title, _, a1 = range_name.partition("!")
+    return title, a1 or None
+
+
+def _trim(rows):
+    """Drop trailing blank cells and rows, as the API does in value responses."""
+    out = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        out.append(row)
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+class FakeWorksheet:
+    """One worksheet: a list of rows of strings plus a nominal grid size."""
+
+    def __init__(self, spreadsheet, title, ws_id, rows=1000, cols=26):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = ws_id
+        self._rows = int(rows)
+        self._cols = int(cols)
+        self.isSheetHidden = False
+        self.data = []
+
+    @property
+    def row_count(self):
+        return max(self._rows, len(self.data))
+
+    @property
+    def col_count(self):
+        return max(self._cols, max((len(row) for row in self.data), default=0))
+
+    # --- direct access, no latency / quota (for seeding and assertions) ---
+    def load(self, rows):
+        self.data = [[str(v) for v in row] for row in rows]
+
+    def _values(self, a1=None):
+        if a1 is None:
+            return _trim(self.data)
+        grid = a1_range_to_grid_range(a1)
+        r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(self.data))
+        c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+        return _trim(row[c0:c1] for row in self.data[r0:r1])
+
+    def _write(self, a1, values):
+        grid = a1_range_to_grid_range(a1)
+        r0, c0 = grid.get("startRowIndex", 0), grid.get("startColumnIndex", 0)
+        for i, row in enumerate(values):
+            while len(self.data) <= r0 + i:
+                self.data.append([])
+            target = self.data[r0 + i]
+            if len(target) < c0 + len(row):
+                target.extend([""] * (c0 + len(row) - len(target)))
+            for j, value in enumerate(row):
+                target[c0 + j] = "" if value is None else str(value)
+
+    # --- gspread API ---
+    def get_all_values(self):
+        def run():
+            width = max((len(row) for row in self.data), default=0)
+            return [row + [""] * (width - len(row)) for row in _trim(self.data)]
+        return self.spreadsheet._call("get_all_values", run)
+
+    def clear(self):
+        def run():
+            self.data = []
+        return self.spreadsheet._call("clear", run, changes=True)
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        def run():
+            self.data = _trim(self.data)
+            self.data.extend([["" if v is None else str(v) for v in row] for row in values])
+        return self.spreadsheet._call("append_rows", run, cells=sum(len(row) for row in values), changes=True)
+
+    def hide(self):
+        def run():
+            self.isSheetHidden = True
+        return self.spreadsheet._call("hide", run, changes=True)
+
+    def update(self, values, range_name="A1", **kwargs):
+        return self.batch_update([{"range": range_name, "values": values}])
+
+    def batch_update(self, data, **kwargs):
+        def run():
+            for entry in data:
+                self._write(entry["range"], entry["values"])
+        cells = sum(len(row) for entry in data for row in entry["values"])
+        return self.spreadsheet._call("batch_update", run, cells=cells, changes=True)
+
+
+class FakeSpreadsheet:
+    """A spreadsheet of FakeWorksheets; calls go through the service's gate."""
+
+    def __init__(self, service, title):
+        self.service = service
+        self.title = title
+        self._worksheets = {}
+        self._next_id = 0
+        self.updated = time.time()
+        self.lock = threading.RLock()
+
+    def _call(self, method, fn, cells=0, changes=False):
+        self.service._gate(method, cells)
+        with self.lock:
+            result = fn()
+            if changes:
+                self.updated = time.time()
+        return result
+
+    def _sheet(self, title):
+        ws = self._worksheets.get(title)
+        if ws is None:
+            raise api_error(400, f"Unable to parse range: {title}", "INVALID_ARGUMENT")
+        return ws
+
+    # --- direct access, no latency / quota ---
+    def load(self, sheets):
+        """Create or replace worksheets from {title: rows}."""
+        with self.lock:
+            for title, rows in sheets.items():
+                ws = self._worksheets.get(title) or self._add(title, max(1000, len(rows)), 26)
+                ws.load(rows)
+
+    def _add(self, title, rows, cols):
+        ws = FakeWorksheet(self, title, self._next_id, rows, cols)
+        self._next_id += 1
+        self._worksheets[title] = ws
+        return ws
+
+    # --- gspread API ---
+    def worksheet(self, title):
+        def run():
+            ws = self._worksheets.get(title)
+            if ws is None:
+                raise gspread.exceptions.WorksheetNotFound(title)
+            return ws
+        return self._call("worksheet", run)
+
+    def worksheets(self, exclude_hidden=False):
+        return self._call("worksheets", lambda: [ws for ws in self._worksheets.values()
+                                                 if not (exclude_hidden and ws.isSheetHidden)])
+
+    def add_worksheet(self, title, rows, cols, index=None):
+        def run():
+            if title in self._worksheets:
+                raise api_error(400, f'A sheet with the name "{title}" already exists.', "INVALID_ARGUMENT")
+            return self._add(title, rows, cols)
+        return self._call("add_worksheet", run, changes=True)
+
+    def values_get(self, range_name, params=None):
+        def run():
+            title, a1 = split_range(range_name)
+            return {"range": range_name, "values": self._sheet(title)._values(a1)}
+        return self._call("values_get", run)
+
+    def values_batch_get(self, ranges, params=None):
+        def run():
+            out = []
+            for range_name in ranges:
+                title, a1 = split_range(range_name)
+                out.append({"range": range_name, "values": self._sheet(title)._values(a1)})
+            return {"spreadsheetId": self.title, "valueRanges": out}
+        return self._call("values_batch_get", run)
+
+    def values_batch_update(self, body=None):
+        def run():
+            for entry in body["data"]:
+                title, a1 = split_range(entry["range"])
+                self._sheet(title)._write(a1 or "A1", entry["values"])
+            return {"totalUpdatedCells": cells}
+        cells = sum(len(row) for entry in body["data"] for row in entry["values"])
+        return self._call("values_batch_update", run, cells=cells, changes=True)
+
+    def get_lastUpdateTime(self):
+        return self._call("get_lastUpdateTime", lambda: f"{self.updated:.6f}")
+
+
+class FakeSheetsService:
+    """Fake gspread client with latency, shared quotas and failure injection.
+
+    ``latency`` (+ up to ``jitter``) seconds are slept on every call, plus
+    ``cell_latency`` per cell written. ``read_quota`` / ``write_quota`` are
+    calls per rolling minute across all callers (None: unlimited); a call
+    over quota fails with a 429 APIError and doesn't run. ``failure_rate``
+    is the chance that any call fails with a 503 instead.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, cell_latency=0.0, read_quota=None, write_quota=None,
+                 failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.cell_latency = cell_latency
+        self.quotas = {"read": read_quota, "write": write_quota}
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+        self._windows = {"read": deque(), "write": deque()}
+        self._scheduled = []  # [remaining, status, methods or None]
+        self._stats = Counter()
+
+    def spreadsheet(self, title):
+        """The spreadsheet named ``title``, created empty if needed (no latency)."""
+        with self._lock:
+            if title not in self._spreadsheets:
+                self._spreadsheets[title] = FakeSpreadsheet(self, title)
+            return self._spreadsheets[title]
+
+    def open(self, title):
+        self._gate("open")
+        return self.spreadsheet(title)
+
+    def inject_failures(self, count, status=503, methods=None):
+        """Fail the next ``count`` calls (of ``methods`` only, if given) with ``status``."""
+        with self._lock:
+            self._scheduled.append([count, status, set(methods) if methods else None])
+
+    def stats(self):
+        """Call counts per method plus "quota_rejections" and "injected_failures"."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _gate(self, method, cells=0):
+        kind = "read" if method in READ_CALLS else "write"
+        delay = self.latency + self._random.uniform(0, self.jitter) + cells * self.cell_latency
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self._stats[method] += 1
+            for entry in self._scheduled:
+                if entry[2] is None or method in entry[2]:
+                    entry[0] -= 1
+                    if entry[0] <= 0:
+                        self._scheduled.remove(entry)
+                    self._stats["injected_failures"] += 1
+                    raise api_error(entry[1], f"Injected failure on {method}")
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self._stats["injected_failures"] += 1
+                raise api_error(503, f"Injected failure on {method}")
+            quota = self.quotas[kind]
+            if quota is not None:
+                window = self._windows[kind]
+                now = time.monotonic()
+                while window and window[0] <= now - 60:
+                    window.popleft()
+                if len(window) >= quota:
+                    self._stats["quota_rejections"] += 1
+                    raise api_error(429, f"Quota exceeded for {kind} requests per minute",
+                                    "RESOURCE_EXHAUSTED")
+                window.append(now)
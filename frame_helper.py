@@ -0,0 +1,162 @@
+"""Frame plumbing for the sheet views: cleaning, compact storage, sorting
+and paging.
+
+Cached sheets are held compactly: columns that repeat a few values (Area,
+Make, Panel, Status...) as categoricals, the rest as Arrow-backed strings
+when pyarrow is installed. The views keep the whole cleaned sheet on the
+server and only hand the visible page to Streamlit, so what gets serialized
+to the browser stays the same size however long the sheet grows.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = (50, 100, 250, 500)
+
+# bookkeeping column with a stable id per row; kept in the store, hidden in views
+ROW_ID_COLUMN = "_ROW_ID"
+
+# a column becomes categorical when it has at most this many distinct
+# values per row (and the sheet is long enough for it to pay off)
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MIN_ROWS = 32
+
+
+def _string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return object
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:  # pandas < 2.3
+        return pd.StringDtype("pyarrow")
+
+
+_STRING_DTYPE = _string_dtype()
+
+
+def compact_frame(df):
+    """Copy of an all-string ``df`` with dictionary-encoded repetitive columns
+    and Arrow strings elsewhere. Values and column order are unchanged."""
+    out = df.copy(deep=False)
+    rows = len(df)
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        if rows >= CATEGORY_MIN_ROWS and col.nunique() <= rows * CATEGORY_MAX_RATIO:
+            out.isetitem(i, col.astype("category"))
+        elif col.dtype != _STRING_DTYPE:
+            out.isetitem(i, col.astype(_STRING_DTYPE))
+    return out
+
+
+def set_cell(df, row, col, value):
+    """``df.at[row, col] = value`` that also works on categorical columns."""
+    column = df[col]
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        df[col] = column.cat.add_categories([value])
+    df.at[row, col] = value
+
+
+def frame_memory(df):
+    """Bytes held by ``df``, including the string data."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def clean_df(df):
+    """Compact, all-string copy of ``df`` without "Unnamed", row-id or blank
+    columns and with nan/None placeholders blanked."""
+    df = df.loc[:, [col for col in df.columns
+                    if not str(col).lower().startswith("unnamed") and col != ROW_ID_COLUMN]]
+    df = df.astype(str)
+    df = df.replace(['nan', 'NaN', 'None', 'NONE'], '')
+    df = df.loc[:, (df != '').any(axis=0)]
+    return compact_frame(df)
+
+
+def _sort_key(col):
+    """Numeric sort key when every non-blank cell is a number, else case-folded text."""
+    text = col.astype(str).str.strip()
+    numbers = pd.to_numeric(text, errors="coerce")
+    if numbers.notna().sum() == (text != "").sum():
+        return numbers
+    return text.str.lower().where(text != "")
+
+
+def sort_order(df, column, descending=False):
+    """Index labels of ``df`` ordered by ``column``; blanks go last either way."""
+    key = _sort_key(df[column])
+    order = key.sort_values(ascending=not descending, kind="stable", na_position="last")
+    return order.index.to_numpy()
+
+
+def restrict_order(order, index):
+    """Keep only the labels of ``order`` present in ``index``, in order."""
+    if len(order) == len(index):
+        return order
+    return order[np.isin(order, index.to_numpy())]
+
+
+def page_bounds(total, page, page_size):
+    """Clamp a 1-based page number; returns (page, pages, start, stop)."""
+    pages = max(1, -(-total // page_size))
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    return page, pages, start, min(start + page_size, total)
+
+
+def page_window(df, start, stop, order=None):
+    """Rows ``start:stop`` of ``df``, optionally in the label order ``order``."""
+    if order is None:
+        return df.iloc[start:stop]
+    return df.loc[order[start:stop]]
+
+
+def find_area_column(df):
+    """The sheet's "Area" column (matched case- and space-insensitively), or None."""
+    return next((col for col in df.columns if str(col).strip().lower() == "area"), None)
+
+
+class AreaIndex:
+    """Row positions of every Area value of one sheet.
+
+    Built once per sheet version so listing areas, counting their rows and
+    opening one are lookups instead of full-frame scans. Area values are
+    compared with surrounding spaces stripped; rows with a blank Area are
+    left out.
+    """
+
+    def __init__(self, df, area_col=None):
+        self.column = area_col if area_col is not None else find_area_column(df)
+        self.positions = {}
+        if self.column is None or df.empty:
+            return
+        values = df[self.column].astype(str).str.strip().to_numpy()
+        codes, uniques = pd.factorize(values, sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))
+        start = np.count_nonzero(codes < 0)
+        for area, stop in zip(uniques, bounds + start):
+            if area != "":
+                self.positions[area] = order[start:stop]
+            start = stop
+
+    @property
+    def areas(self):
+        """Area values in sorted order."""
+        return list(self.positions)
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by the index."""
+        return sys.getsizeof(self.positions) + sum(
+            sys.getsizeof(area) + sys.getsizeof(rows) + rows.nbytes  # rows are views of one array
+            for area, rows in self.positions.items())
+
+    def count(self, area):
+        return len(self.positions.get(area, ()))
+
+    def rows(self, df, area):
+        """Rows of ``df`` (the frame the index was built from) in ``area``."""
+        return df.iloc[self.positions.get(area, np.empty(0, dtype=np.intp))]
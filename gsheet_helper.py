@@ -1,8 +1,17 @@
-import gspread
+import itertools
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
-from google.oauth2.service_account import Credentials
 import streamlit as st
 
+from frame_helper import ROW_ID_COLUMN, compact_frame, frame_memory, set_cell
+from quota_scheduler import RequestScheduler
+from sheet_backends import GoogleSheetsBackend, RowConflictError, SQLiteBackend, row_checksum
+
 # --- Friendly check so the app doesn't crash if secrets.toml is missing ---
 def _load_service_account():
     if "service_account" not in st.secrets:
@@ -14,49 +23,704 @@ def _load_service_account():
         raise SystemExit
     return dict(st.secrets["service_account"])
 
-SERVICE_ACCOUNT_INFO = _load_service_account()
-
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
 SHEET_NAME = "CentralAutomationDB"  # Use your Google Sheet name
+SQLITE_PATH = "chandragupta.db"      # default file for the local backend
+
+
+def _database_settings():
+    """Backend settings from secrets ([database] block), falling back to env vars."""
+    try:
+        settings = dict(st.secrets.get("database", {}))
+    except Exception:
+        settings = {}
+    return {
+        "backend": str(settings.get("backend") or os.getenv("CHANDRAGUPTA_DB_BACKEND", "gsheets")).strip().lower(),
+        "sqlite_path": settings.get("sqlite_path") or os.getenv("CHANDRAGUPTA_SQLITE_PATH", SQLITE_PATH),
+        # Sheets API pacing, per quota class (see quota_scheduler)
+        "reads_per_minute": int(settings.get("reads_per_minute") or os.getenv("CHANDRAGUPTA_READS_PER_MIN", 50)),
+        "writes_per_minute": int(settings.get("writes_per_minute") or os.getenv("CHANDRAGUPTA_WRITES_PER_MIN", 50)),
+    }
+
+
+def _make_backend():
+    settings = _database_settings()
+    if settings["backend"] == "sqlite":
+        return SQLiteBackend(settings["sqlite_path"])
 
-creds = Credentials.from_service_account_info(SERVICE_ACCOUNT_INFO, scopes=SCOPES)
-client = gspread.authorize(creds)
+    import gspread
+    from google.oauth2.service_account import Credentials
 
-@st.cache_resource
-def _open_spreadsheet():
-    return client.open(SHEET_NAME)
+    creds = Credentials.from_service_account_info(_load_service_account(), scopes=SCOPES)
+    scheduler = RequestScheduler(settings["reads_per_minute"], settings["writes_per_minute"])
+    return GoogleSheetsBackend(gspread.authorize(creds), SHEET_NAME, scheduler=scheduler)
+
+
+# Created on first data access (or by warm_up), not at import: authorizing
+# against Google costs a few round trips that the login page shouldn't wait on.
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the storage backend all reads and writes go through."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _make_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the storage backend (tests, benchmarks, local mirrors) and drop the cache."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    with _probe_lock:
+        _probe.update(at=None, revisions=None, error=None)
+    with _sheet_cache_lock:
+        _last_read.clear()
+        _refresh_queue.clear()
+    invalidate_sheet_catalog()
+    clear_sheet_cache()
+
+
+def warm_up(sheet_names=()):
+    """Connect to the backend and load ``sheet_names`` into the cache.
+
+    Meant to run in a background thread while nobody is waiting on it, e.g.
+    while the login form is shown. Failures are left for the first real
+    access to report. Returns the seconds spent per step.
+    """
+    timings = {}
+    started = time.perf_counter()
+    try:
+        get_backend()
+        timings["connect"] = time.perf_counter() - started
+        if sheet_names:
+            started = time.perf_counter()
+            load_sheets_from_db(list(sheet_names))
+            timings["prefetch"] = time.perf_counter() - started
+    except (Exception, SystemExit):  # missing secrets exit the script; not this thread
+        pass
+    return timings
 
 
 def get_sheet(sheet_name):
-    """Return the worksheet object, create it if not exists."""
-    sh = _open_spreadsheet()  # use cached spreadsheet
+    """Return the worksheet object, create it if not exists (Google Sheets only)."""
+    return get_backend().get_sheet(sheet_name)
+
+
+def api_stats():
+    """Call counters of the backend's request scheduler ({} for local backends)."""
+    scheduler = getattr(get_backend(), "scheduler", None)
+    return scheduler.stats() if scheduler is not None else {}
+
+
+def list_sheet_titles():
+    """Return the titles of every worksheet in the database (from the catalog)."""
+    return sheet_catalog().titles()
+
+
+# A cached sheet is refetched only when its revision stamp moves. Stamps are
+# probed at most every REVISION_PROBE_INTERVAL seconds (one cheap call for all
+# sheets); SHEET_MAX_AGE is a safety net for edits that slip past the probe.
+# Backends without stamps fall back to a plain SHEET_CACHE_TTL.
+REVISION_PROBE_INTERVAL = 15
+SHEET_MAX_AGE = 900
+SHEET_CACHE_TTL = 180
+
+# Stale-while-revalidate: a stale cached sheet is served as-is while a
+# background thread refetches it, and sheets read within HOT_SHEET_WINDOW
+# seconds are refreshed ahead of expiry so readers never wait on the API.
+# Only a sheet that was never loaded is fetched inline.
+BACKGROUND_REFRESH = True
+HOT_SHEET_WINDOW = 600
+
+
+_versions = itertools.count(1)
+
+
+class _CachedSheet:
+    """A fetched sheet plus anything derived from it (search haystacks etc.)."""
+
+    __slots__ = ("fetched_at", "df", "derived", "version", "revision", "error")
+
+    def __init__(self, fetched_at, df, revision=None):
+        self.fetched_at = fetched_at
+        self.df = df
+        self.derived = {}
+        self.version = next(_versions)
+        self.revision = revision  # backend revision stamp the frame matches
+        self.error = None  # message of the last failed refresh, if any
+
+
+# sheet_name -> _CachedSheet; shared by every session of this process
+_sheet_cache = {}
+_sheet_cache_lock = threading.Lock()
+
+# background refresh bookkeeping (guarded by _sheet_cache_lock)
+_last_read = {}  # sheet_name -> monotonic time of the last read
+_refresh_queue = set()  # stale sheets a reader is waiting on
+_refresh_wakeup = threading.Event()
+_refresher = None
+
+# last answer of backend.revisions(), and when it was asked
+_probe = {"at": None, "revisions": None, "error": None}
+_probe_lock = threading.Lock()
+_probe_flight = threading.Lock()  # held by the one thread probing right now
+
+
+def current_revisions(force=False):
+    """Return the backend's {sheet: revision} map, probing at most every
+    REVISION_PROBE_INTERVAL seconds (or now, with ``force``).
+
+    Only one thread probes at a time, with a single attempt and no backoff;
+    everyone else gets the last known map at once instead of waiting on the
+    API. A failed probe keeps that map and is retried after the interval.
+    Only the very first probe (nothing known yet) and forced probes wait.
+
+    If the store-wide stamp moved while no sheet stamp did, someone edited
+    the spreadsheet outside the app and every cached sheet is dropped.
+    Returns None when the backend has no revision stamps.
+    """
+    with _probe_lock:
+        due = force or _probe["at"] is None or time.monotonic() - _probe["at"] >= REVISION_PROBE_INTERVAL
+        if not due:
+            return _probe["revisions"]
+        wait = force or _probe["at"] is None
+    if not _probe_flight.acquire(blocking=wait):
+        with _probe_lock:  # another thread is probing; serve what we have
+            return _probe["revisions"]
     try:
-        ws = sh.worksheet(sheet_name)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=sheet_name, rows="1000", cols="20")
-    return ws
+        with _probe_lock:
+            previous = _probe["revisions"]
+            if not force and _probe["at"] is not None and time.monotonic() - _probe["at"] < REVISION_PROBE_INTERVAL:
+                return previous  # probed by the thread we waited on
+        try:
+            revisions = get_backend().revisions(retry=False)
+        except Exception as exc:
+            with _probe_lock:
+                _probe.update(at=time.monotonic(), error=str(exc) or type(exc).__name__)
+            return previous
+        with _probe_lock:
+            _probe.update(at=time.monotonic(), revisions=revisions, error=None)
+    finally:
+        _probe_flight.release()
 
+    if revisions and previous and previous.get("*") is not None and revisions.get("*") != previous.get("*"):
+        sheet_stamps = {k: v for k, v in revisions.items() if k != "*"}
+        if sheet_stamps == {k: v for k, v in previous.items() if k != "*"}:
+            clear_sheet_cache()
+    return revisions
 
-@st.cache_data(ttl=180)
-def load_sheet_from_db(sheet_name):
-    """Load data from Google Sheet worksheet into pandas DataFrame."""
-    ws = get_sheet(sheet_name)
-    data = ws.get_all_values()
+
+def _record_own_write(sheet_name, revision):
+    """Note a revision produced by this process so it doesn't trigger a refetch."""
+    with _probe_lock:
+        if _probe["revisions"] is not None:
+            revisions = dict(_probe["revisions"])
+            revisions[sheet_name] = revision
+            revisions["*"] = None  # our write moved the store stamp too; re-learn it
+            _probe["revisions"] = revisions
+
+
+def _is_fresh(name, entry, revisions, now):
+    if revisions is None:
+        return now - entry.fetched_at < SHEET_CACHE_TTL
+    return now - entry.fetched_at < SHEET_MAX_AGE and entry.revision == revisions.get(name)
+
+
+def _ensure_refresher():
+    global _refresher
+    if _refresher is None or not _refresher.is_alive():
+        _refresher = threading.Thread(target=_refresh_loop, name="sheet-refresher", daemon=True)
+        _refresher.start()
+
+
+def _refresh_loop():
+    while True:
+        _refresh_wakeup.wait(REVISION_PROBE_INTERVAL)
+        _refresh_wakeup.clear()
+        try:
+            refresh_stale_sheets()
+        except Exception:
+            pass  # keep serving the last good snapshots; the next round retries
+
+
+def refresh_stale_sheets():
+    """Refetch, in one batched read, every hot or requested sheet that is
+    stale or would expire before the next round. Returns the names refetched.
+
+    Runs on the background refresher thread; a failed fetch leaves the old
+    snapshots in place, flagged with the error.
+    """
+    revisions = current_revisions()
+    now = time.monotonic()
+    with _sheet_cache_lock:
+        wanted = set(_refresh_queue)
+        _refresh_queue.clear()
+        wanted.update(name for name, at in _last_read.items() if now - at < HOT_SHEET_WINDOW)
+        due = {
+            name: _sheet_cache[name] for name in wanted
+            if name in _sheet_cache
+            and not _is_fresh(name, _sheet_cache[name], revisions, now + REVISION_PROBE_INTERVAL)
+        }
+    if not due:
+        return []
+
+    try:
+        rows = get_backend().read_sheets(list(due))
+    except Exception as exc:
+        with _sheet_cache_lock:
+            for entry in due.values():
+                entry.error = str(exc) or type(exc).__name__
+        raise
+    with _sheet_cache_lock:
+        for name, old in due.items():
+            if _sheet_cache.get(name) is old:  # not replaced by a write meanwhile
+                revision = revisions.get(name) if revisions else None
+                _sheet_cache[name] = _CachedSheet(now, _values_to_df(rows.get(name)), revision)
+    return list(due)
+
+
+def sheet_status(sheet_name):
+    """Describe the cached copy of a sheet: {"age", "stale", "error"}, or None.
+
+    ``stale`` means a newer revision exists (or the copy is past its max
+    age) and a background refresh is pending; ``error`` is set when the last
+    refresh or change probe failed and the copy shown may be out of date.
+    """
+    with _probe_lock:
+        revisions, probe_error = _probe["revisions"], _probe["error"]
+    now = time.monotonic()
+    with _sheet_cache_lock:
+        entry = _sheet_cache.get(sheet_name)
+        if entry is None:
+            return None
+        return {
+            "age": now - entry.fetched_at,
+            "stale": not _is_fresh(sheet_name, entry, revisions, now),
+            "error": entry.error or probe_error,
+        }
+
+
+def parse_io_title(title):
+    """Split an IO_AREA_SHEETNAME worksheet title into (area, sub-sheet label)."""
+    name = title[3:]  # remove 'IO_'
+    parts = name.split("_", 1)
+    area = parts[0] if parts else name
+    sub = parts[1] if len(parts) > 1 else "(Sheet)"
+    return area, sub
+
+
+class SheetCatalog:
+    """Snapshot of the database's worksheets: titles, ids and sizes, plus the
+    IO LIST hierarchy parsed from the IO_AREA_SHEETNAME titles.
+
+    Built from one backend metadata call and shared read-only by every
+    session; get it through sheet_catalog().
+    """
+
+    def __init__(self, sheets):
+        self.sheets = sheets  # [{"title", "id", "rows", "cols"}] in backend order
+        self.by_title = {sheet["title"]: sheet for sheet in sheets}
+        self.io_areas = {}  # area -> [(sub-sheet label, title)], sorted by title
+        for title in sorted(t for t in self.by_title if t.upper().startswith("IO_")):
+            area, sub = parse_io_title(title)
+            self.io_areas.setdefault(area, []).append((sub, title))
+
+    def titles(self):
+        return list(self.by_title)
+
+    def io_titles(self):
+        return [title for subs in self.io_areas.values() for _, title in subs]
+
+
+_catalog = {"value": None, "at": None, "stamp": None}
+_catalog_lock = threading.Lock()
+_ADOPT_NEXT_STAMP = object()  # catalog survived our own edit; take the next probed stamp
+
+
+def _catalog_stamp(revisions):
+    """What the catalog is checked against: the store-wide stamp if the
+    backend has one, else the whole revision map."""
+    if revisions is None:
+        return None
+    if "*" in revisions:
+        return revisions["*"]
+    return tuple(sorted(revisions.items()))
+
+
+def sheet_catalog(force=False):
+    """Return the cached SheetCatalog, rebuilding it only when the store changed.
+
+    Change detection rides on the revision probe (no extra call); backends
+    without revisions fall back to SHEET_CACHE_TTL. If the rebuild fails, the
+    previous catalog is kept.
+    """
+    revisions = current_revisions()
+    stamp = _catalog_stamp(revisions)
+    now = time.monotonic()
+    with _catalog_lock:
+        cat = _catalog["value"]
+        if cat is not None and not force:
+            age = now - _catalog["at"]
+            if revisions is None:
+                if age < SHEET_CACHE_TTL:
+                    return cat
+            elif age < SHEET_MAX_AGE:
+                if _catalog["stamp"] is _ADOPT_NEXT_STAMP and stamp is not None:
+                    _catalog["stamp"] = stamp
+                if stamp is None or _catalog["stamp"] == stamp:
+                    return cat
+    try:
+        fresh = SheetCatalog(get_backend().describe_sheets())
+    except Exception:
+        if cat is None:
+            raise
+        return cat
+    with _catalog_lock:
+        _catalog.update(value=fresh, at=now, stamp=stamp)
+    return fresh
+
+
+def invalidate_sheet_catalog():
+    """Forget the catalog so the next sheet_catalog() call rebuilds it."""
+    with _catalog_lock:
+        _catalog.update(value=None, at=None, stamp=None)
+
+
+def _values_to_df(data):
+    """Turn a raw list of rows (header first) into a DataFrame."""
     if not data or len(data) < 2:
         return pd.DataFrame()
-    header, *values = data
-    df = pd.DataFrame(values, columns=header)
-    return df
+    width = max(len(row) for row in data)
+    header, *values = [list(row) + [""] * (width - len(row)) for row in data]
+    return compact_frame(pd.DataFrame(values, columns=header, dtype=object))
+
+
+def clear_sheet_cache(sheet_name=None):
+    """Drop one cached sheet, or all of them when no name is given."""
+    with _sheet_cache_lock:
+        if sheet_name is None:
+            _sheet_cache.clear()
+        else:
+            _sheet_cache.pop(sheet_name, None)
+
+
+def load_sheets_from_db(sheet_names):
+    """Load several worksheets into DataFrames, keyed by sheet name.
+
+    Cached sheets whose revision hasn't changed are served from memory. With
+    BACKGROUND_REFRESH, stale cached sheets are served too and refetched on
+    the refresher thread. All the others are pulled from the backend in one
+    batched read; if that fails, any older cached copies are served instead
+    (see sheet_status). Worksheets that don't exist come back as empty
+    DataFrames.
+    """
+    revisions = current_revisions()
+    now = time.monotonic()
+    frames, missing, stale = {}, [], []
+    with _sheet_cache_lock:
+        for name in dict.fromkeys(sheet_names):
+            _last_read[name] = now
+            hit = _sheet_cache.get(name)
+            if hit and _is_fresh(name, hit, revisions, now):
+                frames[name] = hit.df
+            elif hit and BACKGROUND_REFRESH:
+                frames[name] = hit.df
+                stale.append(name)
+            else:
+                missing.append(name)
+        _refresh_queue.update(stale)
+
+    if BACKGROUND_REFRESH:
+        _ensure_refresher()
+        if stale:
+            _refresh_wakeup.set()
+
+    if missing:
+        try:
+            rows = get_backend().read_sheets(missing)
+        except Exception as exc:
+            with _sheet_cache_lock:
+                fallback = {name: _sheet_cache[name] for name in missing if name in _sheet_cache}
+                if len(fallback) < len(missing):
+                    raise
+                for name, entry in fallback.items():
+                    entry.error = str(exc) or type(exc).__name__
+                    frames[name] = entry.df
+            return frames
+        fetched = {name: _values_to_df(rows.get(name)) for name in missing}
+        with _sheet_cache_lock:
+            for name, df in fetched.items():
+                revision = revisions.get(name) if revisions else None
+                _sheet_cache[name] = _CachedSheet(now, df, revision)
+        frames.update(fetched)
+    return frames
+
+
+def load_sheets_for_export(sheet_names):
+    """load_sheets_from_db without the internal ROW_ID_COLUMN, for exports.
+
+    Row ids mean nothing outside this database; a re-upload gets new ones.
+    """
+    return {name: df.drop(columns=ROW_ID_COLUMN, errors="ignore")
+            for name, df in load_sheets_from_db(sheet_names).items()}
+
+
+def load_sheet_from_db(sheet_name):
+    """Load data from a worksheet into pandas DataFrame.
+
+    The returned frame is shared through the cache, so treat it as read-only.
+    """
+    return load_sheets_from_db([sheet_name])[sheet_name]
+
+def sheet_version(sheet_name, raw=None):
+    """Return a token that changes whenever the cached copy of a sheet changes.
+
+    With ``raw``, the token is that of the given copy; if it has been
+    replaced in the cache meanwhile, a token no other copy shares is returned.
+    """
+    if raw is None:
+        raw = load_sheet_from_db(sheet_name)
+    with _sheet_cache_lock:
+        entry = _sheet_cache.get(sheet_name)
+        if entry is not None and entry.df is raw:
+            return entry.version
+    return next(_versions)
+
+
+def sheet_memory():
+    """Memory held by each cached sheet: {name: {"rows", "bytes"}}.
+
+    Counts the frame itself plus the derived values stored next to it:
+    frames and series (cleaned copy, search haystack), numpy arrays (sort
+    orders) and anything reporting its own ``nbytes`` (search and area
+    indexes, prepared MOPR data).
+    """
+    with _sheet_cache_lock:
+        entries = list(_sheet_cache.items())
+    report = {}
+    for name, entry in entries:
+        size = frame_memory(entry.df)
+        for value in list(entry.derived.values()):
+            if isinstance(value, pd.DataFrame):
+                size += frame_memory(value)
+            elif isinstance(value, pd.Series):
+                size += int(value.memory_usage(index=True, deep=True))
+            elif hasattr(value, "nbytes"):  # numpy arrays, RowIndex, AreaIndex, MoprData
+                size += int(value.nbytes)
+        report[name] = {"rows": len(entry.df), "bytes": size}
+    return report
+
+
+def cached_for_sheet(sheet_name, key, build, df=None):
+    """Return ``build(df)`` for the current copy of a sheet, computed only once.
+
+    The result is stored next to the cached frame under ``key`` and is
+    dropped automatically when the sheet is refetched or edited. Pass the
+    frame as ``df`` when building one derived value from another, so both
+    belong to the same copy.
+    """
+    if df is None:
+        df = load_sheet_from_db(sheet_name)
+    with _sheet_cache_lock:
+        entry = _sheet_cache.get(sheet_name)
+        if entry is not None and entry.df is df and key in entry.derived:
+            return entry.derived[key]
+    value = build(df)
+    with _sheet_cache_lock:
+        entry = _sheet_cache.get(sheet_name)
+        if entry is not None and entry.df is df:
+            entry.derived[key] = value
+    return value
+
 
 def save_sheet_to_db(sheet_name, df):
-    """Save pandas DataFrame to Google Sheet worksheet (replace all data)."""
-    ws = get_sheet(sheet_name)
-    ws.clear()
-    ws.append_row(df.columns.tolist())
-    rows = df.astype(str).values.tolist()
-    if rows:
-        ws.append_rows(rows)
-    load_sheet_from_db.clear()
+    """Save pandas DataFrame to a worksheet (replace all data).
+
+    Only meant for bulk Excel uploads; edits should go through
+    update_sheet_cells so a single change doesn't rewrite the whole sheet.
+    """
+    df = with_row_ids(df)
+    rows = [[str(c) for c in df.columns]] + df.astype(str).values.tolist()
+    revision = get_backend().write_sheet(sheet_name, rows)
+    _record_own_write(sheet_name, revision)
+    invalidate_sheet_catalog()  # the sheet may be new, and its size changed
+    # cache what was just written instead of reading it back
+    with _sheet_cache_lock:
+        _sheet_cache[sheet_name] = _CachedSheet(time.monotonic(), _values_to_df(rows), revision)
+
+
+def upload_sheets(frames, progress=None, max_workers=4):
+    """Replace several sheets at once, e.g. from an uploaded Excel workbook.
+
+    ``frames`` maps sheet name to DataFrame. Sheets are written concurrently
+    by a bounded worker pool; the backend chunks large sheets and retries
+    quota errors. A failing sheet doesn't stop the others. Returns
+    {sheet_name: {"rows", "seconds", "error"}} and calls
+    ``progress(done, total, sheet_name, result)`` from the calling thread as
+    each sheet finishes.
+    """
+    def upload(name):
+        start = time.perf_counter()
+        error = None
+        try:
+            save_sheet_to_db(name, frames[name])
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+        return {"rows": len(frames[name]), "seconds": time.perf_counter() - start, "error": error}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(upload, name): name for name in frames}
+        for future in as_completed(futures):
+            name = futures[future]
+            results[name] = future.result()
+            if progress:
+                progress(len(results), len(frames), name, results[name])
+    return results
+
+
+def diff_frames(old_df, new_df):
+    """Return {(row_index, column): new_value} for every cell that differs.
+
+    Both frames are compared on the rows and columns of ``new_df``. Missing
+    values in ``new_df`` (st.data_editor gives None for a cleared cell) count
+    as blank, so a cleared cell is written as "" rather than "nan".
+    """
+    old = old_df.reindex(index=new_df.index, columns=new_df.columns).astype(str)
+    new = new_df.astype(object).fillna("").astype(str)
+    changed = (old != new).to_numpy()
+    updates = {}
+    for r, c in zip(*changed.nonzero()):
+        updates[(new.index[r], new.columns[c])] = new.iat[r, c]
+    return updates
+
+
+def with_row_ids(df):
+    """``df`` with a ROW_ID_COLUMN holding a stable id for every row.
+
+    Existing ids are kept; rows without one get a fresh random id.
+    """
+    ids = df[ROW_ID_COLUMN].astype(str) if ROW_ID_COLUMN in df.columns else pd.Series("", index=df.index)
+    blank = ids.str.strip() == ""
+    if not blank.any() and ROW_ID_COLUMN in df.columns:
+        return df
+    ids = ids.astype(object)
+    ids[blank] = [uuid.uuid4().hex[:10] for _ in range(int(blank.sum()))]
+    df = df.drop(columns=[ROW_ID_COLUMN], errors="ignore")
+    return df.assign(**{ROW_ID_COLUMN: ids.to_numpy()})
+
+
+def row_ref(sheet_name, row_idx, raw=None):
+    """(row id, checksum) of a row of the cached sheet, for update_sheet_cells.
+
+    The id is the row's ROW_ID_COLUMN value; it is None on sheets without
+    ids and for rows added in Google Sheets with a blank id, which are then
+    found by their index label. Take the ref when the row is shown, from
+    the ``raw`` copy the view was built from, so an edit is checked against
+    what the user actually saw rather than a copy refreshed since.
+    """
+    if raw is None:
+        raw = load_sheet_from_db(sheet_name)
+    values = raw.loc[row_idx].astype(str).tolist()
+    row_id = str(raw.at[row_idx, ROW_ID_COLUMN]).strip() if ROW_ID_COLUMN in raw.columns else ""
+    return row_id or None, row_checksum(values)
+
+
+def _row_labels_by_id(sheet_name, raw):
+    """{row id: index label} for the given cached copy (built once per copy).
+
+    Blank ids are left out; those rows are only found by their label.
+    """
+    if ROW_ID_COLUMN not in raw.columns:
+        return {}
+    def build(raw):
+        ids = raw[ROW_ID_COLUMN].astype(str).str.strip()
+        return {row_id: label for label, row_id in zip(raw.index, ids) if row_id}
+    return cached_for_sheet(sheet_name, "row_ids", build, df=raw)
+
+
+def update_sheet_cells(sheet_name, updates, expected=None):
+    """Write only the given cells to the worksheet in one batched update.
+
+    ``updates`` maps (row_index, column_name) to the new value, where
+    row_index is the index label of the frame returned by
+    load_sheet_from_db (0 is the first row under the header). Returns the
+    number of cells written.
+
+    ``expected`` maps row_index to the row_ref taken when the row was shown.
+    Each edited row is then located by its id, so it is found even if rows
+    moved (rows without an id by their label), and checked against its
+    checksum; if any row changed meanwhile, RowConflictError is raised,
+    nothing is written and the cached copy is dropped so the next read
+    shows the current data.
+    """
+    if not updates:
+        return 0
+    cached = load_sheet_from_db(sheet_name)
+    checks = None
+    if expected:
+        labels = _row_labels_by_id(sheet_name, cached)
+        moved, checks, lost = {}, {}, []
+        for row_idx, (row_id, checksum) in expected.items():
+            label = row_idx if row_id is None else labels.get(str(row_id))
+            if label is None or label not in cached.index:
+                lost.append(row_idx)
+                continue
+            moved[row_idx] = label
+            checks[int(label) + 2] = checksum
+        if lost:
+            clear_sheet_cache(sheet_name)
+            raise RowConflictError(sheet_name, [int(r) + 2 for r in lost])
+        updates = {(moved.get(row_idx, row_idx), col): value for (row_idx, col), value in updates.items()}
+    col_pos = {}
+    for pos, col in enumerate(cached.columns):
+        col_pos.setdefault(col, pos)
+    missing = {col for _, col in updates if col not in col_pos}
+    if missing:
+        raise ValueError(f"Columns not found in {sheet_name}: {', '.join(sorted(map(str, missing)))}")
+
+    cells = {
+        (int(row_idx) + 2, col_pos[col] + 1): "" if value is None else str(value)  # header is row 1
+        for (row_idx, col), value in updates.items()
+    }
+    try:
+        previous, revision = get_backend().update_cells(sheet_name, cells, expected=checks)
+    except RowConflictError:
+        clear_sheet_cache(sheet_name)
+        raise
+    _record_own_write(sheet_name, revision)
+    with _catalog_lock:
+        if _catalog["value"] is not None:
+            _catalog["stamp"] = _ADOPT_NEXT_STAMP  # cell edits leave the catalog as is
+    _patch_cached_sheet(sheet_name, updates, revision, based_on=previous)
+    return len(updates)
+
+
+def _patch_cached_sheet(sheet_name, updates, revision, based_on=None):
+    """Apply written cells to the cached frame instead of refetching the sheet.
+
+    Only done when the cached copy was at revision ``based_on``, the stamp
+    the write replaced; a copy that misses someone else's change in between
+    is dropped so it gets refetched.
+    """
+    with _sheet_cache_lock:
+        hit = _sheet_cache.get(sheet_name)
+        if not hit:
+            return
+        if based_on is None or hit.revision != based_on:
+            _sheet_cache.pop(sheet_name, None)
+            return
+        df = hit.df.copy()
+        for (row_idx, col), value in updates.items():
+            if row_idx in df.index:
+                set_cell(df, row_idx, col, "" if value is None else str(value))
+        _sheet_cache[sheet_name] = _CachedSheet(hit.fetched_at, df, revision)
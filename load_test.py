@@ -0,0 +1,220 @@
+"""Simulated concurrent sessions against the fake Google Sheets service.
+
+Seeds a FakeSheetsService with a synthetic database, points gsheet_helper
+at it through the real GoogleSheetsBackend and request scheduler, then runs
+N sessions on threads of this one process, the way Streamlit runs sessions
+sharing one sheet cache. Each session logs in (startup load of the
+dashboard sheets) and then browses, searches and edits at random, with a
+think time between actions. Action latencies are reported as percentiles
+in JSON, with the fake service's call counts and the scheduler's stats:
+
+    python load_test.py --sessions 20 --actions 30 --latency 0.2 --failure-rate 0.01
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import gsheet_helper
+from fake_sheets import FakeSheetsService
+from frame_helper import AreaIndex, clean_df, page_window
+from quota_scheduler import RequestScheduler
+from search_helper import build_haystack, search_rows
+from sheet_backends import RowConflictError, GoogleSheetsBackend
+from synthetic_db import DASHBOARD_SHEETS, WORDS, make_database
+
+# how often each action is picked after login
+ACTION_WEIGHTS = {"browse": 5, "area": 3, "search": 3, "search_all": 1, "edit": 1}
+PERCENTILES = (50, 90, 95, 99)
+
+
+def seed_service(service, frames):
+    """Load ``frames`` into the service's spreadsheet as the app would store them."""
+    rows = {}
+    for name, df in frames.items():
+        df = gsheet_helper.with_row_ids(df)
+        rows[name] = [[str(c) for c in df.columns]] + df.astype(str).values.tolist()
+    service.spreadsheet(gsheet_helper.SHEET_NAME).load(rows)
+
+
+def _clean(name):
+    return gsheet_helper.cached_for_sheet(name, "clean", clean_df)
+
+
+def _haystack(name):
+    return gsheet_helper.cached_for_sheet(name, "haystack", lambda raw: build_haystack(_clean(name)))
+
+
+class Session:
+    """One simulated user; ``run`` performs the actions and records latencies."""
+
+    def __init__(self, number, sheets, io_titles, actions, think, rng, record):
+        self.number = number
+        self.sheets = sheets
+        self.io_titles = io_titles
+        self.actions = actions
+        self.think = think
+        self.rng = rng
+        self.record = record
+
+    def run(self):
+        self._timed("login", lambda: gsheet_helper.load_sheets_from_db(self.sheets + ["MOPR"]))
+        names, weights = zip(*ACTION_WEIGHTS.items())
+        for _ in range(self.actions):
+            if self.think:
+                time.sleep(self.rng.uniform(0, 2 * self.think))
+            action = self.rng.choices(names, weights)[0]
+            self._timed(action, getattr(self, action))
+
+    def _timed(self, action, fn):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            fn()
+        except RowConflictError:
+            outcome = "conflict"
+        except Exception as exc:
+            outcome = f"error: {type(exc).__name__}"
+        self.record(action, time.perf_counter() - started, outcome)
+
+    def _pick_sheet(self):
+        if self.io_titles and self.rng.random() < 0.3:
+            return self.rng.choice(self.io_titles)
+        return self.rng.choice(self.sheets)
+
+    def browse(self):
+        df = _clean(self._pick_sheet())
+        start = self.rng.randrange(0, max(1, len(df)), 100) if len(df) else 0
+        page_window(df, start, start + 100)
+
+    def area(self):
+        name = self.rng.choice(self.sheets)
+        df = _clean(name)
+        index = gsheet_helper.cached_for_sheet(name, "areas", lambda raw: AreaIndex(_clean(name)))
+        if index.areas:
+            page_window(index.rows(df, self.rng.choice(index.areas)), 0, 100)
+
+    def search(self):
+        name = self._pick_sheet()
+        search_rows(_clean(name), self.rng.choice(WORDS), _haystack(name))
+
+    def search_all(self):
+        query = self.rng.choice(WORDS)
+        names = self.sheets + self.io_titles
+        gsheet_helper.load_sheets_from_db(names)
+        for name in names:
+            search_rows(_clean(name), query, _haystack(name))
+
+    def edit(self):
+        name = self.rng.choice(self.sheets)
+        df = _clean(name)
+        if df.empty:
+            return
+        row = df.index[self.rng.randrange(len(df))]
+        column = self.rng.choice(list(df.columns))
+        ref = gsheet_helper.row_ref(name, row)
+        gsheet_helper.update_sheet_cells(name, {(row, column): f"edited by session {self.number}"},
+                                         expected={row: ref})
+
+
+def _summary(latencies):
+    values = np.asarray(latencies)
+    out = {"count": int(values.size)}
+    if values.size:
+        for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            out[f"p{p}"] = float(v)
+        out["mean"] = float(values.mean())
+        out["max"] = float(values.max())
+    return out
+
+
+def run(sessions=10, actions=20, think=0.5, rows=2500, io_sheets=40, latency=0.2, jitter=0.1,
+        read_quota=300, write_quota=300, failure_rate=0.0, reads_per_minute=250, writes_per_minute=250,
+        seed=0):
+    """Run the simulation and return the report dict."""
+    frames = make_database(rows=rows, io_sheets=io_sheets, seed=seed)
+    service = FakeSheetsService(latency=latency, jitter=jitter, read_quota=read_quota,
+                                write_quota=write_quota, failure_rate=failure_rate, seed=seed)
+    seed_service(service, frames)
+    scheduler = RequestScheduler(reads_per_minute, writes_per_minute)
+    gsheet_helper.set_backend(GoogleSheetsBackend(service, gsheet_helper.SHEET_NAME, scheduler=scheduler))
+
+    lock = threading.Lock()
+    latencies = defaultdict(list)
+    outcomes = defaultdict(lambda: defaultdict(int))
+
+    def record(action, seconds, outcome):
+        with lock:
+            if outcome == "ok":
+                latencies[action].append(seconds)
+            outcomes[action][outcome] += 1
+
+    io_titles = [name for name in frames if name.startswith("IO_")]
+    threads = [
+        threading.Thread(
+            target=Session(i, list(DASHBOARD_SHEETS), io_titles, actions, think,
+                           random.Random(seed * 1000 + i), record).run,
+            name=f"session-{i}", daemon=True)
+        for i in range(sessions)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "settings": {"sessions": sessions, "actions": actions, "think": think, "rows": rows,
+                     "io_sheets": io_sheets, "latency": latency, "jitter": jitter,
+                     "read_quota": read_quota, "write_quota": write_quota, "failure_rate": failure_rate,
+                     "reads_per_minute": reads_per_minute, "writes_per_minute": writes_per_minute,
+                     "seed": seed},
+        "wall_seconds": wall,
+        "actions": {action: {**_summary(latencies[action]), "outcomes": dict(outcomes[action])}
+                    for action in sorted(outcomes)},
+        "service_calls": service.stats(),
+        "scheduler": scheduler.stats(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app's data layer against a fake Sheets API.")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--actions", type=int, default=20, help="actions per session after login")
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds between actions")
+    parser.add_argument("--rows", type=int, default=2500, help="rows of the largest dashboard sheet")
+    parser.add_argument("--io-sheets", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per API call")
+    parser.add_argument("--jitter", type=float, default=0.1, help="extra random seconds per API call")
+    parser.add_argument("--read-quota", type=int, default=300, help="API reads allowed per minute")
+    parser.add_argument("--write-quota", type=int, default=300, help="API writes allowed per minute")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="chance an API call fails with 503")
+    parser.add_argument("--reads-per-minute", type=int, default=250, help="scheduler pacing for reads")
+    parser.add_argument("--writes-per-minute", type=int, default=250, help="scheduler pacing for writes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.sessions, args.actions, args.think, args.rows, args.io_sheets, args.latency,
+                 args.jitter, args.read_quota, args.write_quota, args.failure_rate,
+                 args.reads_per_minute, args.writes_per_minute, args.seed)
+    for action, res in report["actions"].items():
+        if res["count"]:
+            print(f"{action:<11} n={res['count']:<5} p50={res['p50'] * 1000:8.1f} ms  "
+                  f"p95={res['p95'] * 1000:8.1f} ms  p99={res['p99'] * 1000:8.1f} ms", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
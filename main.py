@@ -1,47 +1,344 @@
+import time
+SCRIPT_START = time.perf_counter()
 import streamlit as st
-import pandas as pd
 import base64
-import io
-import gsheet_helper
-from gsheet_helper import load_sheet_from_db, save_sheet_to_db
+import hashlib
+import threading
+from streamlit.errors import StreamlitAPIException
 from textwrap import dedent
-import re
+from datetime import datetime
 import os
 import json
+# pandas and the data helpers are imported below the login form (see
+# "DATA IMPORTS"), so a cold start paints the form before paying for them.
 
-# --- Fix for Excel export: strip illegal XML/control chars ---
-_ILLEGAL_CTRL = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F]')
+@st.cache_data(max_entries=16, show_spinner=False)
+def export_view_bytes(sheet_name, version, view_filter, fmt, _df):
+    """Build the export file for one view of a sheet.
 
-def _sanitize_excel_str(v):
-    s = "" if v is None else str(v)
-    s = (s.replace("\u00A0", " ")  # NBSP -> space
-         .replace("\uFEFF", "")    # BOM
-         .replace("\u200B", "")    # zero-width space
-         .replace("\u200C", "")    # ZWNJ
-         .replace("\u200D", "")    # ZWJ
-         .replace("\u2060", ""))   # word joiner
-    s = _ILLEGAL_CTRL.sub("", s)   # remove ASCII control chars Excel disallows
-    return s
+    Only called when the user clicks a download button; cached on
+    (sheet, filter, data version, format) so repeat downloads are free.
+    """
+    return export_bytes(_df, fmt, sheet_title=sheet_name)
 
-def sanitize_df_for_excel(df: pd.DataFrame) -> pd.DataFrame:
-    if hasattr(df, "map"):          # pandas >= 2.1
-        return df.map(_sanitize_excel_str)
-    return df.applymap(_sanitize_excel_str)   # purane pandas ke liye
+def export_button(df, sheet_name, view_filter, file_stem, key, raw=None):
+    """Format picker plus a deferred download button for one view of a sheet.
+
+    Pass the ``raw`` copy ``df`` was built from so the cached file is keyed
+    on that copy's version.
+    """
+    version = gsheet_helper.sheet_version(sheet_name, raw)
+    fmt = st.selectbox("Export format", available_formats(), key=f"{key}_fmt")
+    ext, mime, _ = EXPORT_FORMATS[fmt]
+    st.download_button(
+        label="⬇️ Export Excel" if fmt == "xlsx" else f"⬇️ Export {fmt.upper()}",
+        data=lambda: export_view_bytes(sheet_name, version, view_filter, fmt, df),
+        file_name=f"{file_stem}_export.{ext}",
+        mime=mime,
+        key=key
+    )
 
 
+def sheet_sort_order(sheet_name, column, descending, raw=None):
+    """Row order of the cleaned sheet by one column, computed once per cached copy.
 
+    Pass the ``raw`` frame the view was built from so the order matches it.
+    """
+    return gsheet_helper.cached_for_sheet(
+        sheet_name, ("sort", column, descending),
+        lambda raw: sort_order(clean_sheet(sheet_name, raw), column, descending), df=raw,
+    )
 
-def clean_df(df):
-    df = df.loc[:, [col for col in df.columns if not str(col).lower().startswith("unnamed")]]
-    df = df.astype(str)
-    df = df.replace(['nan', 'NaN', 'None', 'NONE'], '')
-    df = df.dropna(axis=1, how='all')
-    df = df.loc[:, (df != '').any(axis=0)]
-    return df
+def paged_table(df, key, height=420, sheet_name=None, editable=False, view_filter=None, raw=None):
+    """Show ``df`` one page at a time, sorted and sliced on the server.
 
-# --------- STYLES ---------
-def set_bg_all():
+    Only the visible page goes to st.dataframe. With ``sheet_name`` the sort
+    order comes from the per-sheet cache (of the copy ``raw``, when given),
+    so paging through a filtered view doesn't re-sort it on every rerun.
+    With ``editable`` the page is shown in a grid editor with a save button
+    (see edit_page); ``view_filter`` (area, search text...) names the view
+    so the editor starts over when it changes.
+    """
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    with c1:
+        sort_col = st.selectbox("Sort by", ["(sheet order)"] + list(df.columns), key=f"{key}_sort")
+    with c2:
+        descending = st.toggle("Descending", key=f"{key}_desc")
+    with c3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    page_key = f"{key}_page"
+    page, pages, start, stop = page_bounds(len(df), st.session_state.get(page_key, 1), page_size)
+    st.session_state[page_key] = page  # clamp after the filter or page size changed
+    with c4:
+        st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+
+    order = None
+    if sort_col != "(sheet order)":
+        if sheet_name:
+            order = restrict_order(sheet_sort_order(sheet_name, sort_col, descending, raw), df.index)
+        else:
+            order = sort_order(df, sort_col, descending)
+    window = page_window(df, start, stop, order)
+    if editable:
+        # a new key for every distinct set of rows, so unsaved edits never
+        # carry over onto other records after a filter, sort or page change
+        view = repr((view_filter, sort_col, descending, page, page_size, window.index.tolist()))
+        view_hash = hashlib.blake2b(view.encode("utf-8"), digest_size=8).hexdigest()
+        edit_page(sheet_name, window, key, height,
+                  f"{key}_editor_{st.session_state.get(f'{key}_gen', 0)}_{view_hash}", raw)
+    else:
+        st.dataframe(window, use_container_width=True, height=height)
+    st.caption(f"Rows {start + 1 if stop else 0}–{stop} of {len(df)}")
+
+def rerun_fragment():
+    """Rerun just the calling fragment; falls back to a full rerun when the
+    fragment is running as part of one."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def edit_base(state_key, sheet_name, row_idx, raw=None):
+    """row_ref of a row as the editor first showed it (from the view's
+    ``raw`` copy), kept across reruns."""
+    base = st.session_state.get(state_key)
+    if base is None or base[0] != (sheet_name, row_idx):
+        base = ((sheet_name, row_idx), gsheet_helper.row_ref(sheet_name, row_idx, raw))
+        st.session_state[state_key] = base
+    return base[1]
+
+def edit_page(sheet_name, window, key, height, editor_key, raw=None):
+    """Grid editor for one page plus a save button that writes only changed cells.
+
+    The edited page is diffed cell by cell against the rows it was built
+    from (``window``, a slice of the view's copy of the sheet) and all
+    changes go out in one batched update. Rows are checked against the
+    version the editor first showed, taken from ``raw`` (the copy the view
+    was built from), so edits to rows someone else changed meanwhile are
+    rejected instead of overwriting that change. Called from inside a
+    fragment, so saving reruns just that fragment.
+    """
+    saved = st.session_state.pop(f"{key}_saved", None)
+    if saved is not None:
+        st.success(f"Saved {saved} changed cells to the database in one update.")
+    conflicts = st.session_state.pop(f"{key}_conflicts", None)
+    if conflicts:
+        st.error(f"Not saved: {conflicts} edited row(s) were changed by someone else since this page "
+                 "was opened. The page now shows the current data; please redo your edits.")
+    # row_refs of the rows this editor was opened on, keyed by row label
+    labels = tuple(window.index)
+    refs = st.session_state.get(f"{key}_refs")
+    if refs is None or refs[0] != editor_key or refs[1] != (sheet_name, labels):
+        refs = (editor_key, (sheet_name, labels),
+                {idx: gsheet_helper.row_ref(sheet_name, idx, raw) for idx in labels})
+        st.session_state[f"{key}_refs"] = refs
+    row_refs = refs[2]
+
+    edited = st.data_editor(window.astype(str), use_container_width=True, height=height,
+                            num_rows="fixed", key=editor_key)
+    updates = gsheet_helper.diff_frames(window, edited)
+    st.caption(f"{len(updates)} changed cells on this page." if updates else "No changes on this page yet.")
+    if st.button("💾 Save changes", key=f"{key}_save", disabled=not updates):
+        rows = {row_idx for row_idx, _ in updates}
+        unchecked = rows - row_refs.keys()
+        try:
+            if unchecked:
+                # never write a row without checking it against what was shown
+                raise gsheet_helper.RowConflictError(sheet_name, unchecked)
+            st.session_state[f"{key}_saved"] = update_sheet_cells(
+                sheet_name, updates, expected={r: row_refs[r] for r in rows})
+        except gsheet_helper.RowConflictError as e:
+            st.session_state[f"{key}_conflicts"] = len(e.rows)
+        # start a fresh editor on the current data either way
+        st.session_state[f"{key}_gen"] = st.session_state.get(f"{key}_gen", 0) + 1
+        st.session_state.pop(f"{key}_refs", None)
+        rerun_fragment()
+
+def show_data_freshness(sheet_name):
+    """Tell the user when a view is showing an older cached copy of a sheet."""
+    status = gsheet_helper.sheet_status(sheet_name)
+    if not status:
+        return
+    minutes = int(status["age"] // 60)
+    age = f"{minutes} min ago" if minutes else "just now"
+    if status["error"]:
+        st.warning(f"⚠️ Google Sheets is not reachable right now; showing data loaded {age}.")
+    elif status["stale"]:
+        st.caption(f"🔄 Showing data loaded {age}; refreshing in the background.")
+
+
+def clean_sheet(sheet_name, raw=None):
+    """The cleaned sheet, produced once per cached copy; treat it as read-only."""
+    return gsheet_helper.cached_for_sheet(sheet_name, "clean", clean_df, df=raw)
+
+def sheet_haystack(sheet_name, raw=None):
+    """Search haystack for the cleaned sheet, built once per cached copy.
+
+    Pass the ``raw`` frame the cleaned sheet came from so both match.
+    """
+    return gsheet_helper.cached_for_sheet(
+        sheet_name, "haystack", lambda raw: build_haystack(clean_sheet(sheet_name, raw)), df=raw)
+
+def sheet_area_index(sheet_name, raw=None):
+    """Area -> row positions of the cleaned sheet, built once per cached copy.
+
+    Pass the ``raw`` frame the cleaned sheet came from so both match.
+    """
+    return gsheet_helper.cached_for_sheet(
+        sheet_name, "areas", lambda raw: AreaIndex(clean_sheet(sheet_name, raw)), df=raw)
+
+def sheet_row_index(sheet_name):
+    """Trigram row index for the cleaned sheet, rebuilt only when the sheet changes."""
+    def build(raw):
+        df = clean_sheet(sheet_name, raw)
+        area_col = find_area_column(df)
+        default_area = parse_io_title(sheet_name)[0] if sheet_name.upper().startswith("IO_") else "(No Area)"
+        return RowIndex(df, area_col, default_area)
+    return gsheet_helper.cached_for_sheet(sheet_name, "row_index", build)
+
+def search_everywhere(query, sheet_names):
+    """Search every given sheet; returns [(sheet, {area: matching rows})]."""
+    load_sheets_from_db(sheet_names)  # one batched fetch for anything not cached
+    return search_indexes({name: sheet_row_index(name) for name in sheet_names}, query)
+
+@st.fragment
+def sheet_data_fragment(sheet_name, area=None):
+    """Search box, table, row editor and export of one sheet (one Area of it
+    when ``area`` is given, the whole IO sheet otherwise).
+
+    Runs as a fragment: typing a search, paging or saving an edit reruns only
+    this part of the page.
+    """
+    io = area is None
+    sfx = "_io" if io else ""
+    raw = load_sheet_from_db(sheet_name)
+    df = clean_sheet(sheet_name, raw)
+    show_data_freshness(sheet_name)
+    if io:
+        filtered_df = df
+        search = st.text_input("🔎 Search in this Sheet...", key="search_in_io_sheet")
+    else:
+        area_index = sheet_area_index(sheet_name, raw)
+        if area_index.column and area != "All":
+            filtered_df = area_index.rows(df, area)
+        else:
+            filtered_df = df
+        search = st.text_input("🔎 Search in this Area...", key="search_in_area")
+    filtered_df2 = search_rows(filtered_df, search, sheet_haystack(sheet_name, raw)) if search else filtered_df
+
+    bulk = IS_ADMIN and st.toggle("✏️ Bulk edit this page", key="bulk_edit_io" if io else "bulk_edit_area")
+    paged_table(filtered_df2, "io_table" if io else "area_table", height=480 if io else 420,
+                sheet_name=sheet_name, editable=bulk, view_filter=search if io else (area, search), raw=raw)
+    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+
+    # ---- Editing (admin only)
+    if len(filtered_df2) > 0:
+        if IS_ADMIN:
+            row_indices = filtered_df2.index.tolist()
+            row_options = [f"Row {i+1}" for i in range(len(row_indices))]
+            selected_row = st.selectbox("Select Row to Edit", options=row_options, key=f"edit_row_select{sfx}")
+            edit_idx = row_indices[row_options.index(selected_row)]
+            if st.session_state.pop(f"edit_conflict{sfx}", False):
+                st.error("Not saved: this row was changed by someone else since you opened it. "
+                         "It now shows the current data; please redo your edit.")
+                for col in filtered_df2.columns:
+                    st.session_state.pop(f"edit_col{sfx}_{col}", None)
+            edit_ref = edit_base(f"edit_base{sfx}", sheet_name, edit_idx, raw)
+            edit_cols = {}
+            with st.expander("Edit Selected Row", expanded=False):
+                st.markdown("<span style='color:#299bff;font-weight:bold;font-size:1.18rem;'>Edit Selected Row</span>", unsafe_allow_html=True)
+                for col in filtered_df2.columns:
+                    edit_cols[col] = st.text_input(f"{col}", filtered_df2.at[edit_idx, col], key=f"edit_col{sfx}_{col}")
+                if st.button("Update Row", key=f"update_row_btn{sfx}"):
+                    changes = {(edit_idx, col): edit_cols[col] for col in filtered_df2.columns
+                               if edit_cols[col] != filtered_df2.at[edit_idx, col]}
+                    if changes:
+                        try:
+                            update_sheet_cells(sheet_name, changes, expected={edit_idx: edit_ref})
+                        except gsheet_helper.RowConflictError:
+                            st.session_state[f"edit_conflict{sfx}"] = True
+                        else:
+                            st.success("Row updated and saved to database.")
+                        st.session_state.pop(f"edit_base{sfx}", None)
+                        rerun_fragment()
+                    else:
+                        st.info("No changes to save.")
+        elif io:
+            st.info("🔒 Viewer mode: you can view and export this sheet. Editing is restricted to admins.")
+        else:
+            st.info("🔒 Viewer mode: you can view and export. Editing is restricted to admins.")
+    else:
+        st.info("No rows to edit.")
+
+    st.markdown("<div style='height:24px'></div>", unsafe_allow_html=True)
+    st.markdown("""
+    <div class="action-btn-container">
+    """, unsafe_allow_html=True)
+    c1, _, _ = st.columns([1,1,1])
+    with c1:
+        if io:
+            export_button(filtered_df2, sheet_name, search, sheet_name, "export_btn_io_sheet", raw=raw)
+        else:
+            export_button(filtered_df2, sheet_name, (area, search), f"{sheet_name}_{area}",
+                          "export_btn_area", raw=raw)
+
+@st.fragment
+def search_all_fragment():
+    """Universal search over every sheet; a new query reruns only this part."""
+    query_all = st.text_input("🔎 Search all sheets and IO lists...", key="univ_search_all")
+    if query_all:
+        try:
+            io_titles = gsheet_helper.sheet_catalog().io_titles()
+        except Exception as e:
+            st.error(f"Could not list IO worksheets: {e}")
+            io_titles = []
+        results = search_everywhere(query_all, all_subsections + sorted(io_titles))
+        total = sum(len(rows) for _, by_area in results for rows in by_area.values())
+        st.markdown(f"**{total} matching rows in {len(results)} sheets**")
+        for hit_sheet, by_area in results:
+            count = sum(len(rows) for rows in by_area.values())
+            with st.expander(f"{hit_sheet} — {count} rows", expanded=len(results) == 1):
+                for hit_area in sorted(by_area):
+                    st.markdown(f"**{hit_area}** ({len(by_area[hit_area])})")
+                    paged_table(by_area[hit_area], f"hits_{hit_sheet}_{hit_area}", height=320)
+
+@st.fragment
+def browse_sheet_fragment():
+    """Sheet picker, search and table of the universal search view."""
+    st.markdown("##### Browse one sheet")
+    cols = st.columns(len(all_subsections))
+    for idx, sheet in enumerate(all_subsections):
+        with cols[idx]:
+            btn_style = "selected-btn" if st.session_state.search_sheet == sheet else ""
+            if st.button(sheet, key=f"search_sheet_{sheet}", use_container_width=True):
+                st.session_state.search_sheet = sheet
+
+    sheet = st.session_state.search_sheet
+    st.markdown(f"**{sheet}**")
+    raw = load_sheet_from_db(sheet)
+    df = clean_sheet(sheet, raw)
+    show_data_freshness(sheet)
+    search = st.text_input(f"Search in {sheet}...", key=f"univ_search_{sheet}")
+    filtered_df = search_rows(df, search, sheet_haystack(sheet, raw)) if search else df
+    st.markdown("<div style='height:10px;'></div>", unsafe_allow_html=True)
+    paged_table(filtered_df, f"search_table_{sheet}", height=650, sheet_name=sheet, raw=raw)
+    st.markdown("<div style='height:22px'></div>", unsafe_allow_html=True)
     st.markdown(
+        """
+        <div class="action-btn-container">
+        """,
+        unsafe_allow_html=True
+    )
+
+    c1, _ = st.columns([1,1])
+    with c1:
+        export_button(filtered_df, sheet, search, sheet, "export_btn_search", raw=raw)
+
+# --------- STYLES ---------
+# CSS and logo are built once per process; every full rerun just re-emits them.
+@st.cache_resource
+def app_css():
+    return (
         f"""
         <style>
         .stApp {{
@@ -168,13 +465,19 @@ def set_bg_all():
             display: none !important;
         }}
         </style>
-        """,
-        unsafe_allow_html=True
+        """
     )
 
-def show_logo_and_title():
+def set_bg_all():
+    st.markdown(app_css(), unsafe_allow_html=True)
+
+@st.cache_resource
+def logo_base64():
     with open("logo.png", "rb") as image_file:
-        encoded = base64.b64encode(image_file.read()).decode()
+        return base64.b64encode(image_file.read()).decode()
+
+def show_logo_and_title():
+    encoded = logo_base64()
     st.markdown(
         f"""
         <div class="logo-title-box">
@@ -185,6 +488,11 @@ def show_logo_and_title():
     )
 
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def mopr_star_markup(rows, fy, month):
+    """Star diagram HTML and height for one (departments, FY, month) selection."""
+    return star_html(list(rows))
+
 def render_mopr():
     """MOPR star topology with Month + FY filters.
 
@@ -198,8 +506,6 @@ def render_mopr():
     - Date (recommended)
     """
 
-    import math, html
-
     show_logo_and_title()
     st.markdown("<div style='height:8px;'></div>", unsafe_allow_html=True)
     st.markdown("### MOPR — Star Topology")
@@ -245,10 +551,10 @@ def render_mopr():
         unsafe_allow_html=True,
     )
 
-    # --- load ---
+    # --- load (prepared once per MOPR sheet version) ---
     try:
         df = load_sheet_from_db("MOPR")
-        df = df.loc[:, [c for c in df.columns if not str(c).lower().startswith("unnamed")]]
+        mopr = gsheet_helper.cached_for_sheet("MOPR", "mopr", prepare_mopr, df=df)
     except Exception as e:
         st.error(f"Could not load MOPR sheet: {e}")
         if st.button("⬅️ Back to Dashboard", key="mopr_back_err"):
@@ -261,304 +567,49 @@ def render_mopr():
             st.session_state.main_view = "dashboard"
         return
 
-    # --- normalize column names (no regex to keep copy-safe) ---
-    def _norm(name: str) -> str:
-        s = str(name).replace(chr(160), " ").strip().lower()
-        s = s.replace("-", " ")
-        s = " ".join(s.split())
-        s = s.replace(" ", "_")
-        return s
-
-    norm_map = {_norm(c): c for c in df.columns if str(c).strip()}
-
-    dept_col = next((norm_map[k] for k in ("department", "dept", "departments") if k in norm_map), None)
-    url_col  = next((norm_map[k] for k in ("ppt_url", "ppturl", "ppt_link", "ppt", "url", "link") if k in norm_map), None)
-    date_col = next((norm_map[k] for k in ("date", "updated", "updated_on", "last_updated", "last_update") if k in norm_map), None)
-
-    month_col = next((norm_map[k] for k in ("month", "mth", "period") if k in norm_map), None)
-    fy_col    = next((norm_map[k] for k in ("financial_year", "financialyear", "fy") if k in norm_map), None)
-
-    if not dept_col or not url_col:
+    if mopr is None:
         st.error("MOPR sheet must have columns like: Department + PPT_URL (aliases ok).")
         if st.button("⬅️ Back to Dashboard", key="mopr_back_cols"):
             st.session_state.main_view = "dashboard"
         return
 
-    keep_cols = [dept_col, url_col]
-    if date_col:
-        keep_cols.append(date_col)
-    if (not date_col) and month_col:
-        keep_cols.append(month_col)
-    if (not date_col) and fy_col:
-        keep_cols.append(fy_col)
-
-    df_work = df[keep_cols].copy()
-    df_work = df_work.dropna(subset=[dept_col])
-
-    # ---------- URL extraction (no regex) ----------
-    stop_chars = " \"<>" + chr(9) + chr(10) + chr(13)
-
-    def extract_url(val) -> str:
-        s = str(val or "")
-        s = (s.replace(chr(160), " ")
-               .replace(chr(8203), "")
-               .replace(chr(8204), "")
-               .replace(chr(8205), "")
-               .strip())
-
-        s_low = s.lower()
-
-        # Case 1: HYPERLINK("url","text")
-        if "hyperlink(" in s_low:
-            start = s_low.find("hyperlink(")
-            q1 = s.find('"', start)
-            if q1 != -1:
-                q2 = s.find('"', q1 + 1)
-                if q2 != -1:
-                    return s[q1 + 1:q2].strip()
-
-        # Case 2: plain http(s)
-        for proto in ("https://", "http://"):
-            p = s_low.find(proto)
-            if p != -1:
-                out = []
-                for ch in s[p:]:
-                    if ch in stop_chars:
-                        break
-                    out.append(ch)
-                return "".join(out).strip()
-
-        return ""
-
-    # ---------- FY helper (Apr–Mar) ----------
-    def fiscal_year_label(dt: pd.Timestamp) -> str:
-        if pd.isna(dt):
-            return ""
-        y = int(dt.year)
-        if int(dt.month) >= 4:
-            start = y
-            end = y + 1
-        else:
-            start = y - 1
-            end = y
-        return f"FY {start}-{str(end)[-2:]}"
+    mopr_star_fragment(mopr)
 
+    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+    if st.button("⬅️ Back to Dashboard", key="mopr_back_btn"):
+        st.session_state.main_view = "dashboard"
+
+
+@st.fragment
+def mopr_star_fragment(mopr):
+    """FY/month filters and the star diagram; reruns on its own when a filter changes."""
     selected_fy = "All"
     selected_month = "All"
 
     # ---------- Filtering ----------
-    if date_col:
-        df_work["__date"] = pd.to_datetime(df_work[date_col], errors="coerce")
-        df_work["__month_label"] = df_work["__date"].dt.strftime("%b %Y")
-        df_work["__fy"] = df_work["__date"].apply(fiscal_year_label)
-
-        df_with_dates = df_work.dropna(subset=["__date"]).copy()
-
-        fy_vals = [v for v in df_with_dates["__fy"].dropna().unique().tolist() if str(v).strip()]
-
-        def _fy_sort_key(v: str) -> int:
-            digits = "".join([c for c in str(v) if c.isdigit()])
-            return int(digits[:4]) if len(digits) >= 4 else 0
-
-        fy_vals = sorted(fy_vals, key=_fy_sort_key, reverse=True)
-
+    # With a Date column both dropdowns always show and the month list
+    # follows the FY; otherwise each shows only if its column has values.
+    fy_vals = mopr.fy_options
+    if mopr.by_date or fy_vals or mopr.month_options():
         c_fy, c_mo, _sp = st.columns([1.2, 1.3, 3.5])
         with c_fy:
-            selected_fy = st.selectbox("Financial Year", options=["All"] + fy_vals, index=0, key="mopr_fy_select")
-
-        tmp = df_with_dates
-        if selected_fy != "All":
-            tmp = tmp[tmp["__fy"] == selected_fy]
-
-        month_df = tmp[["__month_label", "__date"]].dropna(subset=["__date"]).sort_values("__date")
-
-        month_order = []
-        seen = set()
-        for _, r in month_df.iterrows():
-            lab = str(r.get("__month_label", "")).strip()
-            if lab and lab not in seen:
-                month_order.append(lab)
-                seen.add(lab)
-
-        month_order = list(reversed(month_order))
-
+            if mopr.by_date or fy_vals:
+                selected_fy = st.selectbox("Financial Year", options=["All"] + fy_vals, index=0, key="mopr_fy_select")
+        month_vals = mopr.month_options(selected_fy)
         with c_mo:
-            selected_month = st.selectbox("MOPR Month", options=["All"] + month_order, index=0, key="mopr_month_select")
-
-        df_filt = df_work.copy()
-        if selected_fy != "All":
-            df_filt = df_filt[df_filt["__fy"] == selected_fy]
-        if selected_month != "All":
-            df_filt = df_filt[df_filt["__month_label"] == selected_month]
-
-        df_filt = (
-            df_filt.sort_values([dept_col, "__date"], na_position="first")
-                   .groupby(dept_col, as_index=False)
-                   .tail(1)
-        )
-
-    else:
-        df_filt = df_work.copy()
-
-        if month_col:
-            df_filt["__month_label"] = df_filt[month_col].astype(str).str.strip()
-        if fy_col:
-            df_filt["__fy"] = df_filt[fy_col].astype(str).str.strip()
-
-        fy_vals = []
-        month_vals = []
-        if fy_col:
-            fy_vals = sorted([v for v in df_filt["__fy"].unique().tolist() if str(v).strip()], reverse=True)
-        if month_col:
-            month_vals = sorted([v for v in df_filt["__month_label"].unique().tolist() if str(v).strip()], reverse=True)
-
-        if fy_vals or month_vals:
-            c_fy, c_mo, _sp = st.columns([1.2, 1.3, 3.5])
-            with c_fy:
-                if fy_vals:
-                    selected_fy = st.selectbox("Financial Year", options=["All"] + fy_vals, index=0, key="mopr_fy_select")
-            with c_mo:
-                if month_vals:
-                    selected_month = st.selectbox("MOPR Month", options=["All"] + month_vals, index=0, key="mopr_month_select")
-
-            if fy_col and selected_fy != "All":
-                df_filt = df_filt[df_filt["__fy"] == selected_fy]
-            if month_col and selected_month != "All":
-                df_filt = df_filt[df_filt["__month_label"] == selected_month]
-
-        df_filt = df_filt.drop_duplicates(subset=[dept_col], keep="last")
+            if mopr.by_date or month_vals:
+                selected_month = st.selectbox("MOPR Month", options=["All"] + month_vals, index=0, key="mopr_month_select")
 
     # ---------- Build items ----------
-    rows = []
-    for _, r in df_filt.iterrows():
-        d = str(r.get(dept_col, "")).strip()
-        u = extract_url(r.get(url_col, ""))
-        if d:
-            rows.append((d, u))
-
-    rows.sort(key=lambda x: x[0].lower())
+    rows = mopr.departments(selected_fy, selected_month)
 
     if not rows:
         st.info("No departments found for the selected Month/FY. Try another selection or check MOPR data.")
-        if st.button("⬅️ Back to Dashboard", key="mopr_back_nodata"):
-            st.session_state.main_view = "dashboard"
         return
 
-    # --- layout (unchanged) ---
-    n = len(rows)
-    if n <= 12:
-        size = 860;  btn_w, btn_h = 140, 44; radii_f = [0.38]
-    elif n <= 30:
-        size = 920;  btn_w, btn_h = 130, 42; radii_f = [0.30, 0.52]
-    elif n <= 55:
-        size = 980;  btn_w, btn_h = 120, 40; radii_f = [0.26, 0.43, 0.60]
-    else:
-        size = 1080; btn_w, btn_h = 118, 38; radii_f = [0.22, 0.36, 0.52, 0.68]
-
-    center = size // 2
-    radii = [int(size * r) for r in radii_f]
-    rings = len(radii)
-
-    weights = [r for r in radii]
-    total_w = sum(weights)
-    base = [max(0, int(round(n * (w / total_w)))) for w in weights]
-    diff = n - sum(base)
-    if diff != 0:
-        order = sorted(range(rings), key=lambda i: weights[i], reverse=(diff > 0))
-        k = 0
-        while diff != 0:
-            i = order[k % rings]
-            if diff > 0:
-                base[i] += 1; diff -= 1
-            else:
-                if base[i] > 0:
-                    base[i] -= 1; diff += 1
-            k += 1
-    ring_counts = base
-
-    nodes_html, lines = [], []
-    idx = 0
-
-    for r_idx, count in enumerate(ring_counts):
-        if count <= 0:
-            continue
-        radius = radii[r_idx]
-        angle_offset = (math.pi / max(count, 1)) * (r_idx % 2)
-
-        for j in range(count):
-            if idx >= n:
-                break
-            dept, url = rows[idx]; idx += 1
-
-            angle = angle_offset + 2 * math.pi * j / max(count, 1)
-            x = center + int(radius * math.cos(angle)) - btn_w // 2
-            y = center + int(radius * math.sin(angle)) - btn_h // 2
-            x = max(6, min(size - btn_w - 6, x))
-            y = max(6, min(size - btn_h - 6, y))
-            cx = x + btn_w / 2
-            cy = y + btn_h / 2
-
-            if url:
-                lines.append(
-                    f'<line x1="{center}" y1="{center}" x2="{int(cx)}" y2="{int(cy)}" '
-                    f'stroke="url(#grad)" stroke-width="2.5" stroke-linecap="round" opacity="0.9" />'
-                )
-            else:
-                lines.append(
-                    f'<line x1="{center}" y1="{center}" x2="{int(cx)}" y2="{int(cy)}" '
-                    f'stroke="#b9d7ff" stroke-width="2" stroke-linecap="round" '
-                    f'stroke-dasharray="6 6" opacity="0.45" />'
-                )
-
-            label_html = html.escape(dept)
-            common_css = (
-                f"position:absolute; left:{x}px; top:{y}px; border-radius:18px;"
-                f"display:inline-flex; align-items:center; justify-content:center;"
-                f"box-sizing:border-box; width:{btn_w}px; height:{btn_h}px; padding:0 18px;"
-                "overflow:hidden; text-overflow:ellipsis; white-space:nowrap;"
-                "box-shadow:0 2px 12px #8fd3fe60; font-weight:900; z-index:1; text-align:center;"
-            )
-
-            if url:
-                safe_url = url.replace('"', '%22')
-                nodes_html.append(
-                    f'<a href="{safe_url}" target="_blank" rel="noopener" title="{label_html}" '
-                    f'style="{common_css} background:linear-gradient(90deg,#299bff 10%, #55e386 90%); '
-                    f'color:#000; text-decoration:none;">{label_html}</a>'
-                )
-            else:
-                nodes_html.append(
-                    f'<div aria-disabled="true" title="{label_html}" '
-                    f'style="{common_css} background:linear-gradient(90deg,#e3f4ff 10%, #e9ffe4 90%); '
-                    f'color:#2056b5; opacity:0.65; cursor:not-allowed; user-select:none;">{label_html}</div>'
-                )
-
-    edges_svg = (
-        f'<svg width="{size}" height="{size}" viewBox="0 0 {size} {size}" '
-        f'style="position:absolute; left:0; top:0; z-index:0; pointer-events:none;">'
-        f'<defs>'
-        f'  <linearGradient id="grad" gradientUnits="userSpaceOnUse" x1="0" y1="0" x2="{size}" y2="0">'
-        f'    <stop offset="10%" stop-color="#299bff"/>'
-        f'    <stop offset="90%" stop-color="#55e386"/>'
-        f'  </linearGradient>'
-        f'</defs>'
-        f'{"".join(lines)}'
-        f'</svg>'
-    )
-
-    nodes_layer = "".join(nodes_html)
-
-    html_block = (
-        f'<div style="position:relative; width:{size}px; height:{size}px; margin:10px auto 20px auto;'
-        'background:#ffffff; border-radius:16px; box-shadow:0 8px 32px #00000011;">'
-        '<div style="position:absolute; left:50%; top:50%; transform:translate(-50%,-50%);'
-        'padding:12px 20px; border-radius:18px; background:#f4e7da; color:#2056b5; font-weight:900;'
-        'box-shadow:0 2px 12px #8fd3fe60;">MOPR</div>'
-        f'{edges_svg}{nodes_layer}'
-        '</div>'
-    )
-
-    st.components.v1.html(html_block, height=size + 60, scrolling=False)
+    # --- star diagram (markup cached per department set + selection) ---
+    html_block, height = mopr_star_markup(tuple(rows), selected_fy, selected_month)
+    st.components.v1.html(html_block, height=height, scrolling=False)
 
     legend_html = """
      <div style='display:flex;gap:18px;justify-content:center;align-items:center;margin:6px 0 14px 0;flex-wrap:wrap;'>
@@ -575,10 +626,6 @@ def render_mopr():
 
     st.markdown(legend_html, unsafe_allow_html=True)
 
-    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
-    if st.button("⬅️ Back to Dashboard", key="mopr_back_btn"):
-        st.session_state.main_view = "dashboard"
-
 
 # ---------- SHEETS & NAVIGATION STATE ----------
 all_subsections = [
@@ -642,6 +689,30 @@ def load_credentials():
 
 ADMIN_USERS, VIEWERS = load_credentials()
 
+# --- STARTUP: warm the data layer while the login form is up ---
+@st.cache_resource(show_spinner=False)
+def startup_timings():
+    """Seconds spent on the cold-start steps of this process (shown to admins)."""
+    return {}
+
+def _warm_up(timings):
+    started = time.perf_counter()
+    import gsheet_helper
+    import export_helper, mopr_helper, search_helper  # noqa: F401
+    timings["data imports (background)"] = time.perf_counter() - started
+    for step, seconds in gsheet_helper.warm_up(all_subsections + ["MOPR"]).items():
+        timings[f"{step} (background)"] = seconds
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Import the data stack, connect and prefetch the dashboard sheets on a
+    background thread, once per process."""
+    thread = threading.Thread(target=_warm_up, args=(startup_timings(),), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+start_warm_up()
+
 set_bg_all()  # Always apply background
 
 # --- User/Admin at the very top ---
@@ -671,8 +742,20 @@ if st.session_state.login is None:
             st.rerun()
         else:
             st.error("Invalid username or password.")
+    startup_timings().setdefault("login form", time.perf_counter() - SCRIPT_START)
     st.stop()
 
+# --- DATA IMPORTS (usually already done by the warm-up thread) ---
+_imports_started = time.perf_counter()
+import pandas as pd
+import gsheet_helper
+from gsheet_helper import load_sheet_from_db, load_sheets_from_db, parse_io_title, update_sheet_cells
+from search_helper import RowIndex, build_haystack, search_indexes, search_rows
+from export_helper import EXPORT_FORMATS, available_formats, export_all_sheets, export_bytes
+from frame_helper import PAGE_SIZES, AreaIndex, clean_df, find_area_column, page_bounds, page_window, restrict_order, sort_order
+from mopr_helper import prepare_mopr, star_html
+startup_timings().setdefault("data imports (waited)", time.perf_counter() - _imports_started)
+
 login_name = st.session_state.login["user"]
 login_role = st.session_state.login["role"]
 IS_ADMIN = (login_role == "admin")  # <-- viewers are read-only
@@ -689,15 +772,24 @@ if login_role == "admin":
             st.error("No relevant sheets found in this Excel file.")
         else:
             skipped_sheets = []
-            loaded_sheets = []
+            upload_frames = {}
             for sheet in available_sheets:
                 df = xl.parse(sheet)
                 df = clean_df(df)
                 if df.empty or len(df.columns) == 0:
                     skipped_sheets.append(sheet)
                     continue
-                save_sheet_to_db(sheet, df)
-                loaded_sheets.append(sheet)
+                upload_frames[sheet] = df
+            if not upload_frames:
+                st.error("No sheets could be loaded from your Excel. Please check your file.")
+                st.stop()
+            upload_bar = st.sidebar.progress(0.0, text="Uploading sheets...")
+            upload_report = gsheet_helper.upload_sheets(
+                upload_frames,
+                progress=lambda done, total, name, res: upload_bar.progress(done / total, text=f"{done}/{total} · {name}"),
+            )
+            loaded_sheets = [s for s in upload_frames if not upload_report[s]["error"]]
+            failed_sheets = [s for s in upload_frames if upload_report[s]["error"]]
             if not loaded_sheets:
                 st.error("No sheets could be loaded from your Excel. Please check your file.")
                 st.stop()
@@ -705,20 +797,60 @@ if login_role == "admin":
             if loaded_sheets:
                 msg += f"Loaded: {', '.join(loaded_sheets)}. "
             if skipped_sheets:
-                msg += f"Skipped: {', '.join(skipped_sheets)}."
+                msg += f"Skipped: {', '.join(skipped_sheets)}. "
+            if failed_sheets:
+                msg += f"Failed: {', '.join(failed_sheets)}."
             st.success(f"Database refreshed! {msg}")
+            st.session_state.upload_report = upload_report
             st.session_state.db_uploaded = True
             st.rerun()
+    if st.session_state.get("upload_report"):
+        with st.sidebar.expander("Last upload"):
+            st.dataframe(
+                pd.DataFrame([
+                    {"Sheet": name, "Rows": res["rows"], "Seconds": round(res["seconds"], 2),
+                     "Status": res["error"] or "OK"}
+                    for name, res in st.session_state.upload_report.items()
+                ]),
+                hide_index=True, use_container_width=True
+            )
+
+if IS_ADMIN:
+    api_counts = gsheet_helper.api_stats()
+    if api_counts:
+        with st.sidebar.expander("Sheets API usage"):
+            st.markdown(
+                f"Reads: **{api_counts['read_calls']}** · Writes: **{api_counts['write_calls']}**  \n"
+                f"Saved by coalescing: **{api_counts['coalesced']}**  \n"
+                f"Delayed by pacing: **{api_counts['delayed']}** ({api_counts['delay_seconds']:.1f}s)  \n"
+                f"Retries: **{api_counts['retries']}** · Errors: **{api_counts['errors']}**"
+            )
+    with st.sidebar.expander("Startup timings"):
+        for step, seconds in startup_timings().items():
+            st.caption(f"{step}: {seconds * 1000:.0f} ms")
+    with st.sidebar.expander("Cached sheets memory"):
+        memory = gsheet_helper.sheet_memory()
+        if memory:
+            st.dataframe(
+                pd.DataFrame(
+                    [(name, m["rows"], round(m["bytes"] / 2**20, 2)) for name, m in sorted(memory.items())],
+                    columns=["Sheet", "Rows", "MB"],
+                ),
+                hide_index=True,
+            )
+            st.caption(f"Total: {sum(m['bytes'] for m in memory.values()) / 2**20:.1f} MB")
+        else:
+            st.caption("No sheets cached yet.")
 
 # ---- Always load available sheets from DB ----
-available_sheets_db = []
-for s in all_subsections:
-    try:
-        df_check = load_sheet_from_db(s)
-        if not df_check.empty:
-            available_sheets_db.append(s)
-    except:
-        pass
+# One batched fetch warms the cache for every dashboard sheet (and MOPR)
+_load_started = time.perf_counter()
+try:
+    startup_frames = load_sheets_from_db(all_subsections + ["MOPR"])
+except Exception:
+    startup_frames = {}
+startup_timings().setdefault("startup load (waited)", time.perf_counter() - _load_started)
+available_sheets_db = [s for s in all_subsections if s in startup_frames and not startup_frames[s].empty]
 
 if not available_sheets_db:
     st.info("👈 Please (Admin) upload your Excel file once to initialize the database.")
@@ -753,6 +885,39 @@ if st.session_state.main_view == DASHBOARD_VIEW:
     if st.button("⭐ MOPR", key="open_mopr", use_container_width=True):
        st.session_state.main_view = MOPR_VIEW
     st.markdown('</div>', unsafe_allow_html=True)
+    # --- Whole-database export (all dashboard sheets, MOPR and every IO_* worksheet)
+    st.markdown('<div style="height:10px;"></div>', unsafe_allow_html=True)
+    with st.expander("📦 Export everything"):
+        bundle_mode = st.radio("Bundle as", ["One workbook (.xlsx)", "Zip of per-sheet files"], key="bundle_mode", horizontal=True)
+        bundle_as_zip = bundle_mode.startswith("Zip")
+        bundle_fmt = st.selectbox("File format", available_formats(), key="bundle_fmt") if bundle_as_zip else "xlsx"
+        if st.button("Build export", key="build_bundle_btn", use_container_width=True):
+            try:
+                io_titles = gsheet_helper.sheet_catalog().io_titles()
+            except Exception as e:
+                st.error(f"Could not list IO worksheets: {e}")
+                io_titles = []
+            bundle_sheets = all_subsections + ["MOPR"] + sorted(io_titles)
+            bar = st.progress(0.0, text="Fetching sheets...")
+            bundle_data = export_all_sheets(
+                bundle_sheets, gsheet_helper.load_sheets_for_export, bundle_fmt, bundle_as_zip,
+                progress=lambda done, total, name: bar.progress(done / total, text=f"{done}/{total} · {name}"),
+            )
+            stamp = datetime.now().strftime("%Y%m%d_%H%M")
+            if bundle_as_zip:
+                bundle_file = (f"{gsheet_helper.SHEET_NAME}_{stamp}.zip", "application/zip")
+            else:
+                bundle_file = (f"{gsheet_helper.SHEET_NAME}_{stamp}.xlsx", EXPORT_FORMATS["xlsx"][1])
+            st.session_state.bundle_export = bundle_file + (bundle_data,)
+        if st.session_state.get("bundle_export"):
+            bundle_name, bundle_mime, bundle_data = st.session_state.bundle_export
+            st.download_button(
+                label=f"⬇️ Download {bundle_name}",
+                data=bundle_data,
+                file_name=bundle_name,
+                mime=bundle_mime,
+                key="bundle_download_btn"
+            )
 
 
 # =========== SHEET => AREAS VIEW ===========
@@ -765,21 +930,12 @@ elif st.session_state.main_view == SHEET_VIEW:
 
     # --- Special hierarchical flow for IO LIST ---
     if sheet == "IO LIST":
-        # Build IO map from worksheet titles following IO_AREA_SHEETNAME convention
+        # IO map (area -> sub-sheets) from the cached worksheet catalog
         try:
-            sh = gsheet_helper.client.open(gsheet_helper.SHEET_NAME)
-            io_titles = [ws.title for ws in sh.worksheets() if ws.title.upper().startswith("IO_")]
+            io_map = gsheet_helper.sheet_catalog().io_areas
         except Exception as e:
             st.error(f"Could not list IO worksheets: {e}")
-            io_titles = []
-
-        io_map = {}
-        for t in sorted(io_titles):
-            name = t[3:]  # remove 'IO_'
-            parts = name.split("_", 1)
-            area = parts[0] if parts else name
-            sub = parts[1] if len(parts) > 1 else "(Sheet)"
-            io_map.setdefault(area, []).append((sub, t))
+            io_map = {}
 
         # 1) Pick Area
         if st.session_state.selected_area is None:
@@ -830,58 +986,9 @@ elif st.session_state.main_view == SHEET_VIEW:
         # 3) Show full sheet data with edit & export
         else:
             data_sheet_name = st.session_state.io_selected_sheet
-            df = clean_df(load_sheet_from_db(data_sheet_name))
-            search = st.text_input("🔎 Search in this Sheet...", key="search_in_io_sheet")
-            if search:
-                filtered_df2 = df[df.apply(lambda row: row.astype(str).str.contains(search, case=False, na=False).any(), axis=1)]
-            else:
-                filtered_df2 = df
-            filtered_df2 = filtered_df2.astype(str).replace(['nan', 'NaN', 'None', 'NONE'], '')
-
-            st.dataframe(filtered_df2, use_container_width=True, height=480)
-            st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
-
-            # ---- Editing (admin only)
-            if len(filtered_df2) > 0:
-                if IS_ADMIN:
-                    row_indices = filtered_df2.index.tolist()
-                    row_options = [f"Row {i+1}" for i in range(len(row_indices))]
-                    selected_row = st.selectbox("Select Row to Edit", options=row_options, key="edit_row_select_io")
-                    edit_idx = row_indices[row_options.index(selected_row)]
-                    edit_cols = {}
-                    with st.expander("Edit Selected Row", expanded=False):
-                        st.markdown("<span style='color:#299bff;font-weight:bold;font-size:1.18rem;'>Edit Selected Row</span>", unsafe_allow_html=True)
-                        for col in filtered_df2.columns:
-                            edit_cols[col] = st.text_input(f"{col}", filtered_df2.at[edit_idx, col], key=f"edit_col_io_{col}")
-                        if st.button("Update Row", key="update_row_btn_io"):
-                            for col in filtered_df2.columns:
-                                filtered_df2.at[edit_idx, col] = edit_cols[col]
-                            master_df = clean_df(load_sheet_from_db(data_sheet_name))
-                            master_df.update(filtered_df2)
-                            save_sheet_to_db(data_sheet_name, master_df)
-                            st.success("Row updated and saved to database.")
-                            st.rerun()
-                else:
-                    st.info("🔒 Viewer mode: you can view and export this sheet. Editing is restricted to admins.")
-            else:
-                st.info("No rows to edit.")
-
-            st.markdown("<div style='height:24px'></div>", unsafe_allow_html=True)
-            st.markdown("""
-            <div class="action-btn-container">
-            """, unsafe_allow_html=True)
-            excel_buffer = io.BytesIO()
-            sanitize_df_for_excel(filtered_df2).to_excel(excel_buffer, index=False)
+            sheet_data_fragment(data_sheet_name)
 
             c1, c2, c3 = st.columns([1,1,1])
-            with c1:
-                st.download_button(
-                    label="⬇️ Export Excel",
-                    data=excel_buffer.getvalue(),
-                    file_name=f"{data_sheet_name}_export.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key="export_btn_io_sheet"
-                )
             with c2:
                 if st.button("⬅️ Back to Sheets", key="io_back_sheets"):
                     st.session_state.io_selected_sheet = None
@@ -895,20 +1002,15 @@ elif st.session_state.main_view == SHEET_VIEW:
 
     # --- Default behavior for all other sheets (unchanged) ---
     else:
-        df = clean_df(load_sheet_from_db(sheet))
-        area_col = None
-        for col in df.columns:
-            if col.strip().lower() == "area":
-                area_col = col
-                break
-        if area_col:
-            df[area_col] = df[area_col].astype(str).str.strip()
-            areas = sorted(df[area_col].replace(['', ' ', 'nan', 'NaN', 'None', 'NONE'], pd.NA).dropna().unique())
+        area_index = sheet_area_index(sheet)
+        if area_index.column:
+            areas = area_index.areas
             st.markdown("##### Select Area:")
             areacols = st.columns(4)
             for idx, area in enumerate(areas):
                 with areacols[idx % 4]:
-                    if st.button(area, key=f"area_{area}", use_container_width=True):
+                    label = f"{area} ({area_index.count(area)})"
+                    if st.button(label, key=f"area_{area}", use_container_width=True):
                         st.session_state.selected_area = area
                         st.session_state.main_view = AREA_VIEW
             if not areas:
@@ -938,70 +1040,9 @@ elif st.session_state.main_view == AREA_VIEW:
     area = st.session_state.selected_area
     st.markdown(f"#### {sheet} - {area}")
     st.markdown("<div style='height:8px;'></div>", unsafe_allow_html=True)
-    df = clean_df(load_sheet_from_db(sheet))
-    area_col = None
-    for col in df.columns:
-        if col.strip().lower() == "area":
-            area_col = col
-            break
-    if area_col and area != "All":
-        filtered_df = df[df[area_col] == area]
-    else:
-        filtered_df = df
-    search = st.text_input("🔎 Search in this Area...", key="search_in_area")
-    if search:
-        filtered_df2 = filtered_df[filtered_df.apply(lambda row: row.astype(str).str.contains(search, case=False, na=False).any(), axis=1)]
-    else:
-        filtered_df2 = filtered_df
-    filtered_df2 = filtered_df2.astype(str).replace(['nan', 'NaN', 'None', 'NONE'], '')
-
-    st.dataframe(filtered_df2, use_container_width=True, height=420)
-    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
-
-    # ---- Editing (admin only)
-    if len(filtered_df2) > 0:
-        if IS_ADMIN:
-            row_indices = filtered_df2.index.tolist()
-            row_options = [f"Row {i+1}" for i in range(len(row_indices))]
-            selected_row = st.selectbox("Select Row to Edit", options=row_options, key="edit_row_select")
-            edit_idx = row_indices[row_options.index(selected_row)]
-            edit_cols = {}
-            with st.expander("Edit Selected Row", expanded=False):
-                st.markdown("<span style='color:#299bff;font-weight:bold;font-size:1.18rem;'>Edit Selected Row</span>", unsafe_allow_html=True)
-                for col in filtered_df2.columns:
-                    edit_cols[col] = st.text_input(f"{col}", filtered_df2.at[edit_idx, col], key=f"edit_col_{col}")
-                if st.button("Update Row", key="update_row_btn"):
-                    for col in filtered_df2.columns:
-                        filtered_df2.at[edit_idx, col] = edit_cols[col]
-                    master_df = clean_df(load_sheet_from_db(sheet))
-                    master_df.update(filtered_df2)
-                    save_sheet_to_db(sheet, master_df)
-                    st.success("Row updated and saved to database.")
-                    st.rerun()
-        else:
-            st.info("🔒 Viewer mode: you can view and export. Editing is restricted to admins.")
-    else:
-        st.info("No rows to edit.")
-
-    st.markdown("<div style='height:24px'></div>", unsafe_allow_html=True)
-    st.markdown(
-        """
-        <div class="action-btn-container">
-        """,
-        unsafe_allow_html=True
-    )
-    excel_buffer = io.BytesIO()
-    sanitize_df_for_excel(filtered_df2).to_excel(excel_buffer, index=False)
+    sheet_data_fragment(sheet, area)
 
     c1, c2, c3 = st.columns([1,1,1])
-    with c1:
-        st.download_button(
-            label="⬇️ Export Excel",
-            data=excel_buffer.getvalue(),
-            file_name=f"{sheet}_{area}_export.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_btn_area"
-        )
     with c2:
         if st.button("⬅️ Back to Areas", key="back_areas_btn"):
             st.session_state.main_view = SHEET_VIEW
@@ -1018,43 +1059,12 @@ elif st.session_state.main_view == SEARCH_VIEW:
     show_logo_and_title()
     st.markdown("<div style='height:14px;'></div>", unsafe_allow_html=True)
     st.markdown("### Universal Search")
-    cols = st.columns(len(all_subsections))
-    for idx, sheet in enumerate(all_subsections):
-        with cols[idx]:
-            btn_style = "selected-btn" if st.session_state.search_sheet == sheet else ""
-            if st.button(sheet, key=f"search_sheet_{sheet}", use_container_width=True):
-                st.session_state.search_sheet = sheet
 
-    sheet = st.session_state.search_sheet
-    st.markdown(f"**{sheet}**")
-    df = clean_df(load_sheet_from_db(sheet))
-    search = st.text_input(f"Search in {sheet}...", key=f"univ_search_{sheet}")
-    if search:
-        filtered_df = df[df.apply(lambda row: row.astype(str).str.contains(search, case=False, na=False).any(), axis=1)]
-    else:
-        filtered_df = df
-    filtered_df = filtered_df.astype(str).replace(['nan', 'NaN', 'None', 'NONE'], '')
-    st.markdown("<div style='height:10px;'></div>", unsafe_allow_html=True)
-    st.dataframe(filtered_df, use_container_width=True, height=650)
-    st.markdown("<div style='height:22px'></div>", unsafe_allow_html=True)
-    st.markdown(
-        """
-        <div class="action-btn-container">
-        """,
-        unsafe_allow_html=True
-    )
-    excel_buffer = io.BytesIO()
-    sanitize_df_for_excel(filtered_df).to_excel(excel_buffer, index=False)
+    search_all_fragment()
+    st.markdown("<div style='height:14px;'></div>", unsafe_allow_html=True)
+    browse_sheet_fragment()
 
     c1, c2 = st.columns([1,1])
-    with c1:
-        st.download_button(
-            label="⬇️ Export Excel",
-            data=excel_buffer.getvalue(),
-            file_name=f"{sheet}_export.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_btn_search"
-        )
     with c2:
         if st.button("⬅️ Back to Dashboard", key="back_dash_search_btn"):
             st.session_state.main_view = DASHBOARD_VIEW
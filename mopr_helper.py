@@ -0,0 +1,311 @@
+"""MOPR sheet preparation and the star-topology layout.
+
+prepare_mopr() turns the raw MOPR sheet into one tidy frame (department,
+PPT link, date, month label, financial year) using column-wise string and
+date operations, plus the FY and month dropdown options. The app caches the
+result per MOPR sheet version, so changing a dropdown only runs
+MoprData.departments(), a cheap filter on that frame.
+
+star_layout() places any number of department buttons on concentric rings
+around the MOPR hub without overlaps, and star_html() renders the diagram.
+Both are pure, so they can be checked without Streamlit.
+"""
+import html
+import math
+
+import pandas as pd
+
+DEPT_ALIASES = ("department", "dept", "departments")
+URL_ALIASES = ("ppt_url", "ppturl", "ppt_link", "ppt", "url", "link")
+DATE_ALIASES = ("date", "updated", "updated_on", "last_updated", "last_update")
+MONTH_ALIASES = ("month", "mth", "period")
+FY_ALIASES = ("financial_year", "financialyear", "fy")
+
+_HYPERLINK = r'(?i)hyperlink\([^"]*"([^"]*)"'
+_URL_END = r'[^ "<>\t\n\r]*'
+
+
+def _norm(name: str) -> str:
+    s = str(name).replace(chr(160), " ").strip().lower()
+    s = s.replace("-", " ")
+    s = " ".join(s.split())
+    s = s.replace(" ", "_")
+    return s
+
+
+def find_mopr_columns(columns):
+    """Map each MOPR role (dept, url, date, month, fy) to a sheet column or None."""
+    norm_map = {_norm(c): c for c in columns if str(c).strip()}
+
+    def pick(aliases):
+        return next((norm_map[k] for k in aliases if k in norm_map), None)
+
+    return {
+        "dept": pick(DEPT_ALIASES),
+        "url": pick(URL_ALIASES),
+        "date": pick(DATE_ALIASES),
+        "month": pick(MONTH_ALIASES),
+        "fy": pick(FY_ALIASES),
+    }
+
+
+def extract_urls(values):
+    """PPT link of every cell: the target of =HYPERLINK("url", ...) or the
+    first https:// (else http://) address; "" when there is none."""
+    s = (values.astype(str)
+         .str.replace(chr(160), " ", regex=False)
+         .str.replace(chr(8203), "", regex=False)
+         .str.replace(chr(8204), "", regex=False)
+         .str.replace(chr(8205), "", regex=False)
+         .str.strip())
+    urls = s.str.extract(_HYPERLINK, expand=False)
+    for proto in ("https://", "http://"):
+        found = s.str.extract(f"(?i)({proto}{_URL_END})", expand=False)
+        urls = urls.fillna(found)
+    return urls.fillna("").str.strip()
+
+
+def fiscal_years(dates):
+    """India-style (Apr-Mar) FY start year and "FY 2024-25" label per date."""
+    start = (dates.dt.year - (dates.dt.month < 4)).astype("Int64")
+    label = "FY " + start.astype(str) + "-" + ((start + 1) % 100).astype(str).str.zfill(2)
+    return start, label.where(start.notna(), "").astype(object)
+
+
+class MoprData:
+    """Prepared MOPR sheet: a tidy frame plus the dropdown options.
+
+    ``frame`` has the columns dept, url, date, month and fy, and is sorted
+    by (dept, date) with undated rows first, so the last row of each
+    department is its latest entry.
+    """
+
+    def __init__(self, frame, by_date, fy_options, month_options):
+        self.frame = frame
+        self.by_date = by_date  # True when filtering uses the Date column
+        self.fy_options = fy_options
+        self._month_options = month_options  # FY (or "All") -> month labels
+
+    @property
+    def nbytes(self):
+        """Bytes held by the prepared frame."""
+        return int(self.frame.memory_usage(index=True, deep=True).sum())
+
+    def month_options(self, fy="All"):
+        """Month labels for the month dropdown, newest first."""
+        if not self.by_date:
+            return self._month_options["All"]
+        return self._month_options.get(fy, [])
+
+    def departments(self, fy="All", month="All"):
+        """[(department, url)] for the selection, latest entry per department,
+        sorted by name."""
+        df = self.frame
+        if fy != "All":
+            df = df[df["fy"] == fy]
+        if month != "All":
+            df = df[df["month"] == month]
+        df = df.drop_duplicates(subset="dept", keep="last")
+        names = df["dept"].astype(str).str.strip()
+        keep = names != ""
+        rows = list(zip(names[keep], df["url"][keep]))
+        rows.sort(key=lambda x: x[0].lower())
+        return rows
+
+
+def prepare_mopr(df):
+    """Build MoprData from the raw MOPR sheet, or None if the Department or
+    PPT link column is missing.
+
+    With a Date column, FY and month come from the date; otherwise from
+    optional Month / FY columns.
+    """
+    df = df.loc[:, [c for c in df.columns if not str(c).lower().startswith("unnamed")]]
+    cols = find_mopr_columns(df.columns)
+    if not cols["dept"] or not cols["url"]:
+        return None
+
+    frame = pd.DataFrame({
+        "dept": df[cols["dept"]].astype(object),
+        "url": extract_urls(df[cols["url"]]),
+    }, index=df.index).dropna(subset=["dept"])
+
+    if cols["date"]:
+        dates = pd.to_datetime(df.loc[frame.index, cols["date"]], errors="coerce")
+        frame["date"] = dates
+        frame["month"] = dates.dt.strftime("%b %Y").astype(object)
+        fy_start, frame["fy"] = fiscal_years(dates)
+        frame = frame.sort_values(["dept", "date"], na_position="first", kind="stable")
+
+        dated = frame[frame["date"].notna()]
+        fy_order = (pd.DataFrame({"fy": frame["fy"], "start": fy_start})
+                    .loc[dated.index].drop_duplicates("fy").sort_values("start", ascending=False, kind="stable"))
+        fy_options = [fy for fy in fy_order["fy"] if str(fy).strip()]
+
+        by_month = dated.sort_values("date", kind="stable")
+        month_options = {"All": _newest_first(by_month["month"])}
+        for fy, group in by_month.groupby("fy", sort=False):
+            month_options[fy] = _newest_first(group["month"])
+        return MoprData(frame, True, fy_options, month_options)
+
+    frame["date"] = pd.NaT
+    frame["month"] = df.loc[frame.index, cols["month"]].astype(str).str.strip() if cols["month"] else ""
+    frame["fy"] = df.loc[frame.index, cols["fy"]].astype(str).str.strip() if cols["fy"] else ""
+    fy_options = sorted((v for v in frame["fy"].unique() if str(v).strip()), reverse=True) if cols["fy"] else []
+    months = sorted((v for v in frame["month"].unique() if str(v).strip()), reverse=True) if cols["month"] else []
+    return MoprData(frame, False, fy_options, {"All": months})
+
+
+def _newest_first(month_labels):
+    """Distinct month labels of a date-sorted column, newest first."""
+    labels = month_labels.dropna().astype(str).str.strip()
+    return labels[labels != ""].drop_duplicates().tolist()[::-1]
+
+
+# --- star layout ---
+
+# button size by department count: (max departments, width, height)
+BUTTON_TIERS = ((12, 140, 44), (30, 130, 42), (55, 120, 40))
+BUTTON_MIN = (118, 38)
+NODE_GAP = 12  # px kept free between neighbouring buttons
+FIRST_RING = 240  # smallest ring radius; leaves room for the hub label
+SINGLE_RING_MAX = 340  # up to this radius, all buttons go on one ring
+CANVAS_MARGIN = 20
+CANVAS_MIN = 860
+DISPLAY_MAX = 1100  # larger canvases are scaled down to this width
+
+
+def _ring_capacity(radius, spacing):
+    """How many centers fit on a ring with at least ``spacing`` between neighbours."""
+    if spacing >= 2 * radius:
+        return 1
+    return max(1, int(math.pi / math.asin(spacing / (2 * radius))))
+
+
+def _spread(n, capacities):
+    """Split ``n`` nodes over rings in proportion to their capacities."""
+    total = sum(capacities)
+    counts = [min(cap, n * cap // total) for cap in capacities]
+    # hand out the remainder, largest rings first, within capacity
+    for i in sorted(range(len(capacities)), key=lambda i: -capacities[i]):
+        extra = min(capacities[i] - counts[i], n - sum(counts))
+        counts[i] += extra
+    return counts
+
+
+def star_layout(n):
+    """Positions for ``n`` buttons on concentric rings around a center hub.
+
+    Neighbouring centers on a ring, and rings themselves, are at least one
+    button diagonal plus NODE_GAP apart, so no two buttons can overlap; as
+    many rings are added as ``n`` needs and the canvas grows to fit. Returns
+    {"size", "center", "btn_w", "btn_h", "nodes": [(x, y) top-left corners],
+    "rings": [(radius, count)]}.
+    """
+    btn_w, btn_h = next(((w, h) for limit, w, h in BUTTON_TIERS if n <= limit), BUTTON_MIN)
+    spacing = math.hypot(btn_w, btn_h) + NODE_GAP
+
+    single = max(FIRST_RING, spacing / (2 * math.sin(math.pi / max(n, 2))))
+    if single <= SINGLE_RING_MAX:
+        radii, counts = [single], [n]
+    else:
+        radii, capacities = [], []
+        while sum(capacities) < n:
+            radius = FIRST_RING + len(radii) * spacing
+            radii.append(radius)
+            capacities.append(_ring_capacity(radius, spacing))
+        counts = _spread(n, capacities)
+
+    outer = max(radii) if radii else 0
+    size = max(CANVAS_MIN, int(2 * (outer + math.hypot(btn_w, btn_h) / 2 + CANVAS_MARGIN)))
+    center = size // 2
+    nodes, rings = [], []
+    for r_idx, (radius, count) in enumerate(zip(radii, counts)):
+        if count <= 0:
+            continue
+        rings.append((radius, count))
+        angle_offset = (math.pi / count) * (r_idx % 2)
+        for j in range(count):
+            angle = angle_offset + 2 * math.pi * j / count
+            x = center + int(radius * math.cos(angle)) - btn_w // 2
+            y = center + int(radius * math.sin(angle)) - btn_h // 2
+            nodes.append((x, y))
+    return {"size": size, "center": center, "btn_w": btn_w, "btn_h": btn_h, "nodes": nodes, "rings": rings}
+
+
+def star_html(rows):
+    """HTML for the MOPR star: one button per (department, url) in ``rows``.
+
+    Returns (markup, display height in px). Canvases wider than DISPLAY_MAX
+    are scaled down to fit the page.
+    """
+    layout = star_layout(len(rows))
+    size, center = layout["size"], layout["center"]
+    btn_w, btn_h = layout["btn_w"], layout["btn_h"]
+
+    nodes_html, lines = [], []
+    for (dept, url), (x, y) in zip(rows, layout["nodes"]):
+        cx = x + btn_w / 2
+        cy = y + btn_h / 2
+
+        if url:
+            lines.append(
+                f'<line x1="{center}" y1="{center}" x2="{int(cx)}" y2="{int(cy)}" '
+                f'stroke="url(#grad)" stroke-width="2.5" stroke-linecap="round" opacity="0.9" />'
+            )
+        else:
+            lines.append(
+                f'<line x1="{center}" y1="{center}" x2="{int(cx)}" y2="{int(cy)}" '
+                f'stroke="#b9d7ff" stroke-width="2" stroke-linecap="round" '
+                f'stroke-dasharray="6 6" opacity="0.45" />'
+            )
+
+        label_html = html.escape(dept)
+        common_css = (
+            f"position:absolute; left:{x}px; top:{y}px; border-radius:18px;"
+            f"display:inline-flex; align-items:center; justify-content:center;"
+            f"box-sizing:border-box; width:{btn_w}px; height:{btn_h}px; padding:0 18px;"
+            "overflow:hidden; text-overflow:ellipsis; white-space:nowrap;"
+            "box-shadow:0 2px 12px #8fd3fe60; font-weight:900; z-index:1; text-align:center;"
+        )
+
+        if url:
+            safe_url = url.replace('"', '%22')
+            nodes_html.append(
+                f'<a href="{safe_url}" target="_blank" rel="noopener" title="{label_html}" '
+                f'style="{common_css} background:linear-gradient(90deg,#299bff 10%, #55e386 90%); '
+                f'color:#000; text-decoration:none;">{label_html}</a>'
+            )
+        else:
+            nodes_html.append(
+                f'<div aria-disabled="true" title="{label_html}" '
+                f'style="{common_css} background:linear-gradient(90deg,#e3f4ff 10%, #e9ffe4 90%); '
+                f'color:#2056b5; opacity:0.65; cursor:not-allowed; user-select:none;">{label_html}</div>'
+            )
+
+    edges_svg = (
+        f'<svg width="{size}" height="{size}" viewBox="0 0 {size} {size}" '
+        f'style="position:absolute; left:0; top:0; z-index:0; pointer-events:none;">'
+        f'<defs>'
+        f'  <linearGradient id="grad" gradientUnits="userSpaceOnUse" x1="0" y1="0" x2="{size}" y2="0">'
+        f'    <stop offset="10%" stop-color="#299bff"/>'
+        f'    <stop offset="90%" stop-color="#55e386"/>'
+        f'  </linearGradient>'
+        f'</defs>'
+        f'{"".join(lines)}'
+        f'</svg>'
+    )
+
+    scale = min(1.0, DISPLAY_MAX / size)
+    markup = (
+        f'<div style="width:{int(size * scale)}px; height:{int(size * scale)}px; margin:10px auto 20px auto;">'
+        f'<div style="position:relative; width:{size}px; height:{size}px;'
+        f'transform:scale({scale:.4f}); transform-origin:0 0;'
+        'background:#ffffff; border-radius:16px; box-shadow:0 8px 32px #00000011;">'
+        '<div style="position:absolute; left:50%; top:50%; transform:translate(-50%,-50%);'
+        'padding:12px 20px; border-radius:18px; background:#f4e7da; color:#2056b5; font-weight:900;'
+        'box-shadow:0 2px 12px #8fd3fe60;">MOPR</div>'
+        f'{edges_svg}{"".join(nodes_html)}'
+        '</div></div>'
+    )
+    return markup, int(size * scale) + 60
@@ -0,0 +1,146 @@
+"""Pacing for Google Sheets API calls.
+
+The Sheets API enforces per-minute read and write quotas for the service
+account, shared by every Streamlit session of the app. RequestScheduler
+sends each call through a token bucket for its quota class, merges
+identical reads that are already in flight into one request, and backs
+off when the API answers 429 anyway. It counts what it did, so the app
+can show how many calls were saved or delayed.
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+RETRY_ATTEMPTS = 6
+RETRY_BASE_DELAY = 1.0  # seconds; doubled after each failed attempt
+
+
+def is_retryable_error(exc):
+    """True for API errors worth retrying: quota (429) and server-side 5xx."""
+    return is_quota_error(exc) or _status_code(exc) in range(500, 600)
+
+
+def is_quota_error(exc):
+    return _status_code(exc) == 429
+
+
+def _status_code(exc):
+    code = getattr(exc, "code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+class TokenBucket:
+    """Allows ``per_minute`` calls a minute on average, with bursts up to ``burst``."""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is free. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RequestScheduler:
+    """Runs API calls under per-class token buckets ("read" and "write").
+
+    The defaults keep a full minute (burst plus refill) at or under the
+    Sheets API's 60 requests per minute per user, for each class.
+    """
+
+    def __init__(self, reads_per_minute=50, writes_per_minute=50, burst=10):
+        self.buckets = {
+            "read": TokenBucket(reads_per_minute, burst),
+            "write": TokenBucket(writes_per_minute, burst),
+        }
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._stats = {
+            "read_calls": 0,
+            "write_calls": 0,
+            "coalesced": 0,
+            "delayed": 0,
+            "delay_seconds": 0.0,
+            "retries": 0,
+            "errors": 0,
+        }
+
+    def call(self, kind, fn, *args, key=None, retry=True, **kwargs):
+        """Run ``fn(*args, **kwargs)`` as a ``kind`` ("read"/"write") request.
+
+        Calls sharing a ``key`` while one of them is in flight wait for that
+        call and get its result instead of hitting the API again; only pass
+        a key for reads whose result callers don't modify. With
+        ``retry=False`` the call is tried once, for callers that would
+        rather fail fast and fall back than wait out the backoff.
+        """
+        if key is None:
+            return self._run(kind, fn, args, kwargs, retry)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self._stats["coalesced"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._run(kind, fn, args, kwargs, retry)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _run(self, kind, fn, args, kwargs, retry=True):
+        bucket = self.buckets[kind]
+        attempts = RETRY_ATTEMPTS if retry else 1
+        for attempt in range(attempts):
+            waited = bucket.acquire()
+            with self._lock:
+                self._stats[f"{kind}_calls"] += 1
+                if waited:
+                    self._stats["delayed"] += 1
+                    self._stats["delay_seconds"] += waited
+            try:
+                return fn(*args, **kwargs)
+            except Exception as exc:
+                # a failed write may still have been applied, so only quota
+                # rejections are safe to resend for writes
+                retryable = is_retryable_error(exc) if kind == "read" else is_quota_error(exc)
+                if attempt == attempts - 1 or not retryable:
+                    with self._lock:
+                        self._stats["errors"] += 1
+                    raise
+                with self._lock:
+                    self._stats["retries"] += 1
+            time.sleep(RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random() / 2))
+
+    def stats(self):
+        """Snapshot of the call counters."""
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,132 @@
+"""Row search over cached sheet frames.
+
+Instead of testing every cell of every row on each rerun, each row is
+flattened once into a single lowercase string (its "haystack"). A query is
+then one vectorized substring scan over that Series. RowIndex adds a trigram
+inverted index on top for searching many sheets at once.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Joins cell values inside a haystack; never typed in a search box, so a
+# query can't accidentally match across two cells.
+_CELL_SEP = "\x1f"
+
+
+def build_haystack(df):
+    """Return a Series (same index as ``df``) of lowercased, joined row values."""
+    if df.shape[1] == 0:
+        return pd.Series("", index=df.index, dtype=object)
+    cols = [df.iloc[:, i].astype(str) for i in range(df.shape[1])]
+    hay = cols[0].str.cat(cols[1:], sep=_CELL_SEP) if len(cols) > 1 else cols[0]
+    return hay.str.lower()
+
+
+def search_rows(df, query, haystack=None):
+    """Return the rows of ``df`` with ``query`` in any cell, ignoring case.
+
+    ``haystack`` may be a prebuilt haystack for ``df`` or for a larger frame
+    ``df`` was sliced from; it is built on the fly when missing.
+    """
+    if not query:
+        return df
+    if haystack is None:
+        haystack = build_haystack(df)
+    elif not haystack.index.equals(df.index):
+        haystack = haystack.loc[df.index]
+    mask = haystack.str.contains(query.lower(), regex=False)
+    return df[mask.to_numpy(dtype=bool)]
+
+
+_GRAM = 3  # n-gram length used by RowIndex
+
+
+class RowIndex:
+    """Trigram inverted index over the rows of one sheet.
+
+    Every 3-character substring of a row's haystack maps to the positions of
+    the rows containing it. A query of three or more characters only has to
+    intersect a few posting lists and confirm the candidates, so searching
+    many sheets stays fast no matter how many cells they hold. Shorter queries
+    fall back to a plain scan of the row strings.
+
+    Only the row strings and the posting lists are kept. The postings make
+    up the bulk of the index, so they are uint16 on sheets of up to 65536
+    rows.
+    """
+
+    def __init__(self, df, area_col=None, default_area=""):
+        self.df = df
+        self._rows = build_haystack(df).tolist()
+        if area_col is not None and area_col in df.columns:
+            self.areas = df[area_col].astype(str).str.strip().replace("", default_area).to_numpy()
+        else:
+            self.areas = np.full(len(df), default_area, dtype=object)
+
+        postings = {}
+        for pos, text in enumerate(self._rows):
+            for gram in {text[i:i + _GRAM] for i in range(len(text) - _GRAM + 1)}:
+                if _CELL_SEP not in gram:
+                    postings.setdefault(gram, []).append(pos)
+        dtype = np.uint16 if len(self._rows) <= 1 << 16 else np.int32
+        self._postings = {gram: np.array(rows, dtype=dtype) for gram, rows in postings.items()}
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by the index, not counting the frame it indexes."""
+        size = sys.getsizeof(self._rows) + sum(sys.getsizeof(text) for text in self._rows)
+        size += sys.getsizeof(self.areas)
+        if self.areas.dtype == object:
+            size += sum(sys.getsizeof(area) for area in {id(a): a for a in self.areas}.values())
+        size += sys.getsizeof(self._postings)
+        size += sum(sys.getsizeof(gram) + sys.getsizeof(rows) for gram, rows in self._postings.items())
+        return size
+
+    def lookup(self, query):
+        """Return the sorted row positions whose haystack contains ``query``."""
+        q = query.lower()
+        if not q:
+            return np.arange(len(self._rows))
+        if len(q) < _GRAM:
+            return np.array([pos for pos, text in enumerate(self._rows) if q in text], dtype=np.int32)
+
+        lists = []
+        for gram in {q[i:i + _GRAM] for i in range(len(q) - _GRAM + 1)}:
+            rows = self._postings.get(gram)
+            if rows is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(rows)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for rows in lists[1:]:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            if not len(candidates):
+                return candidates
+        if len(q) == _GRAM:
+            return candidates
+        return np.array([pos for pos in candidates if q in self._rows[pos]], dtype=np.int32)
+
+    def hits_by_area(self, query):
+        """Return {area: row positions} for the rows matching ``query``."""
+        positions = self.lookup(query)
+        grouped = {}
+        for area, pos in zip(self.areas[positions], positions):
+            grouped.setdefault(area, []).append(pos)
+        return grouped
+
+
+def search_indexes(indexes, query):
+    """Search several RowIndex objects at once.
+
+    ``indexes`` maps sheet name to its RowIndex. Returns a list of
+    (sheet_name, {area: DataFrame of matching rows}) for every sheet with at
+    least one hit, in the order of ``indexes``.
+    """
+    results = []
+    for sheet_name, index in indexes.items():
+        grouped = index.hits_by_area(query)
+        if grouped:
+            results.append((sheet_name, {area: index.df.iloc[rows] for area, rows in grouped.items()}))
+    return results
@@ -0,0 +1,462 @@
+"""Storage engines behind gsheet_helper.
+
+A sheet is handled as a plain list of rows (lists of strings) with the header
+as the first row, the same shape ``get_all_values`` returns. Every backend
+speaks that shape, so gsheet_helper can cache and convert to DataFrames
+without caring where the rows live.
+
+Backends also keep a revision stamp per sheet that changes on every write,
+so readers can ask "has anything changed?" without refetching sheets, and
+can check rows against the checksum a reader saw before overwriting them.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import uuid
+
+from quota_scheduler import RequestScheduler
+
+WRITE_CHUNK_CELLS = 50_000  # cells per append request when rewriting a sheet
+REVISIONS_SHEET = "_REVISIONS"  # Google Sheets: worksheet holding (sheet, revision) rows
+
+
+def row_checksum(values):
+    """Short content hash of one sheet row; trailing blank cells are ignored."""
+    values = ["" if v is None else str(v) for v in values]
+    while values and values[-1] == "":
+        values.pop()
+    return hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class RowConflictError(Exception):
+    """Rows changed after the caller read them; nothing was written."""
+
+    def __init__(self, sheet_name, rows):
+        self.sheet_name = sheet_name
+        self.rows = sorted(rows)
+        super().__init__(
+            f"{len(self.rows)} row(s) of {sheet_name} changed since they were read: "
+            + ", ".join(map(str, self.rows))
+        )
+
+
+class SheetBackend:
+    """Interface every storage engine implements."""
+
+    def list_sheets(self):
+        """Return the titles of all worksheets."""
+        raise NotImplementedError
+
+    def describe_sheets(self):
+        """Return one {"title", "id", "rows", "cols"} dict per worksheet, in order.
+
+        Engines that can't tell ids or sizes cheaply leave them as None.
+        """
+        return [{"title": title, "id": None, "rows": None, "cols": None} for title in self.list_sheets()]
+
+    def read_sheets(self, sheet_names):
+        """Return {name: rows} for the requested sheets that exist."""
+        raise NotImplementedError
+
+    def write_sheet(self, sheet_name, rows):
+        """Replace a sheet's contents with ``rows``, creating it if needed.
+
+        Returns the sheet's new revision stamp.
+        """
+        raise NotImplementedError
+
+    def update_cells(self, sheet_name, cells, expected=None):
+        """Overwrite single cells; ``cells`` maps 1-based (row, col) to a value.
+
+        ``expected`` optionally maps 1-based rows to the row_checksum the
+        caller based its edit on; if any row differs now, RowConflictError
+        is raised and nothing is written. Returns (previous, new): the
+        revision stamp the write replaced (None if the sheet had none) and
+        the new one, so callers can tell whether their copy was current.
+        """
+        raise NotImplementedError
+
+    def revisions(self, retry=True):
+        """Return {sheet_name: revision} in one cheap call, or None if unsupported.
+
+        The optional ``"*"`` key is a store-wide stamp that also moves on
+        edits made outside the app. ``retry=False`` skips any retrying of
+        failed requests, for callers that can fall back on an older answer.
+        """
+        return None
+
+    def get_sheet(self, sheet_name):
+        """Return the engine's native worksheet object, if it has one."""
+        raise NotImplementedError(f"{type(self).__name__} has no worksheet objects")
+
+
+class GoogleSheetsBackend(SheetBackend):
+    """Sheets stored as worksheets of one Google Spreadsheet (via gspread).
+
+    Every API call goes through ``scheduler`` (a RequestScheduler), which
+    paces calls per quota class, merges identical in-flight reads and
+    retries quota errors.
+    """
+
+    def __init__(self, client, spreadsheet_name, scheduler=None):
+        self.client = client
+        self.spreadsheet_name = spreadsheet_name
+        self.scheduler = scheduler or RequestScheduler()
+        self._spreadsheet = None
+        # guards the spreadsheet handle, the revision worksheet and _revision_rows
+        self._lock = threading.RLock()
+        self._revisions_ws = None
+        self._revision_rows = None  # sheet -> row in REVISIONS_SHEET, from the last probe
+
+    def _read(self, fn, *args, key=None, retry=True, **kwargs):
+        return self.scheduler.call("read", fn, *args, key=key, retry=retry, **kwargs)
+
+    def _write(self, fn, *args, **kwargs):
+        return self.scheduler.call("write", fn, *args, **kwargs)
+
+    def spreadsheet(self):
+        with self._lock:
+            if self._spreadsheet is None:
+                self._spreadsheet = self._read(self.client.open, self.spreadsheet_name)
+            return self._spreadsheet
+
+    def get_sheet(self, sheet_name):
+        """Return the worksheet object, create it if not exists."""
+        import gspread
+
+        sh = self.spreadsheet()
+        try:
+            ws = self._read(sh.worksheet, sheet_name, key=("worksheet", sheet_name))
+        except gspread.exceptions.WorksheetNotFound:
+            ws = self._write(sh.add_worksheet, title=sheet_name, rows="1000", cols="20")
+        return ws
+
+    def _worksheets(self):
+        sh = self.spreadsheet()
+        return self._read(sh.worksheets, key=("worksheets",))
+
+    def list_sheets(self):
+        return [ws.title for ws in self._worksheets() if ws.title != REVISIONS_SHEET]
+
+    def describe_sheets(self):
+        """Worksheet ids and grid sizes, from the same single metadata call."""
+        return [
+            {"title": ws.title, "id": ws.id, "rows": ws.row_count, "cols": ws.col_count}
+            for ws in self._worksheets() if ws.title != REVISIONS_SHEET
+        ]
+
+    def revisions(self, retry=True):
+        """Read the revision worksheet plus the file's last-modified time."""
+        import gspread
+        from gspread.utils import absolute_range_name
+
+        sh = self.spreadsheet()
+        try:
+            resp = self._read(sh.values_get, absolute_range_name(REVISIONS_SHEET, "A:B"),
+                              key=("revisions", retry), retry=retry)
+            rows = resp.get("values", [])
+        except gspread.exceptions.APIError as exc:
+            if exc.code != 400:  # 400: the revision sheet doesn't exist yet
+                raise
+            rows = []
+        revisions, positions = {}, {}
+        for i, row in enumerate(rows, start=1):
+            if row and row[0]:
+                revisions[row[0]] = row[1] if len(row) > 1 else ""
+                positions[row[0]] = i
+        with self._lock:
+            self._revision_rows = positions
+        revisions["*"] = self._read(sh.get_lastUpdateTime, key=("last_update", retry), retry=retry)
+        return revisions
+
+    def _revision_cell(self, sheet_name, token):
+        """Batch entry that stamps an already known revision row, else None."""
+        from gspread.utils import absolute_range_name
+
+        with self._lock:
+            positions = self._revision_rows
+        if positions is None:
+            self.revisions()
+            with self._lock:
+                positions = self._revision_rows or {}
+        row = positions.get(sheet_name)
+        if row is None:
+            return None
+        return {"range": absolute_range_name(REVISIONS_SHEET, f"B{row}"), "values": [[token]]}
+
+    def _revisions_sheet(self):
+        """The hidden revision worksheet, created on first use.
+
+        Creation happens once under the lock, so parallel writes (e.g. an
+        upload) don't race to add it; "already exists" from another process
+        counts as success.
+        """
+        import gspread
+
+        with self._lock:
+            if self._revisions_ws is None:
+                sh = self.spreadsheet()
+                try:
+                    ws = self._read(sh.worksheet, REVISIONS_SHEET)
+                except gspread.exceptions.WorksheetNotFound:
+                    try:
+                        ws = self._write(sh.add_worksheet, title=REVISIONS_SHEET, rows="1000", cols="2")
+                    except gspread.exceptions.APIError as exc:
+                        if exc.code != 400 or "already exists" not in str(exc):
+                            raise
+                        ws = self._read(sh.worksheet, REVISIONS_SHEET)
+                    else:
+                        self._write(ws.hide)
+                self._revisions_ws = ws
+            return self._revisions_ws
+
+    def _add_revision_row(self, sheet_name, token):
+        ws = self._revisions_sheet()
+        self._write(ws.append_row, [sheet_name, token])
+        with self._lock:
+            self._revision_rows = None  # row numbers are re-read on the next probe
+
+    def read_sheets(self, sheet_names):
+        from gspread.utils import absolute_range_name
+
+        titles = {ws.title for ws in self._worksheets()}
+        present = [name for name in sheet_names if name in titles]
+        if not present:
+            return {}
+        ranges = [absolute_range_name(name) for name in present]
+        resp = self._read(self.spreadsheet().values_batch_get, ranges, key=("values", tuple(present)))
+        return {
+            name: value_range.get("values", [])
+            for name, value_range in zip(present, resp.get("valueRanges", []))
+        }
+
+    def write_sheet(self, sheet_name, rows):
+        """Clear the worksheet and append ``rows`` in request-sized chunks."""
+        ws = self.get_sheet(sheet_name)
+        self._write(ws.clear)
+        if rows:
+            self._write(ws.append_row, rows[0])
+        body = rows[1:]
+        width = max((len(row) for row in body), default=1) or 1
+        chunk = max(1, WRITE_CHUNK_CELLS // width)
+        for start in range(0, len(body), chunk):
+            self._write(ws.append_rows, body[start:start + chunk])
+
+        token = uuid.uuid4().hex[:12]
+        stamp = self._revision_cell(sheet_name, token)
+        if stamp:
+            sh = self.spreadsheet()
+            self._write(sh.values_batch_update, {"valueInputOption": "RAW", "data": [stamp]})
+        else:
+            self._add_revision_row(sheet_name, token)
+        return token
+
+    def _read_before_write(self, sheet_name, expected, stamp):
+        """Re-read the expected rows and the sheet's revision stamp in one
+        batched call; compare checksums and return the stamp (or None).
+
+        Sheets has no conditional writes, so a change landing between this
+        read and the update can still slip through; the window is one request.
+        """
+        from gspread.utils import absolute_range_name
+
+        rows = list(expected or {})
+        ranges = [absolute_range_name(sheet_name, f"{row}:{row}") for row in rows]
+        if stamp:
+            ranges.append(stamp["range"])
+        if not ranges:
+            return None
+        resp = self._read(self.spreadsheet().values_batch_get, ranges)
+        values = [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+        values += [[]] * (len(ranges) - len(values))
+        conflicts = [
+            row for row, found in zip(rows, values)
+            if row_checksum(found[0] if found else []) != expected[row]
+        ]
+        if conflicts:
+            raise RowConflictError(sheet_name, conflicts)
+        if stamp:
+            found = values[-1]
+            return found[0][0] if found and found[0] else ""
+        return None
+
+    def update_cells(self, sheet_name, cells, expected=None):
+        """Send all cells (and the revision stamp) in one values batchUpdate.
+
+        The expected rows and the current stamp are read first, in one call.
+        """
+        token = uuid.uuid4().hex[:12]
+        stamp = self._revision_cell(sheet_name, token)
+        previous = self._read_before_write(sheet_name, expected, stamp)
+        by_row = {}
+        for (row, col), value in cells.items():
+            by_row.setdefault(row, {})[col] = value
+
+        data = []
+        for row, row_cells in sorted(by_row.items()):
+            # adjacent cells in a row go out as one range
+            run = []
+            for col in sorted(row_cells):
+                if run and col != run[-1] + 1:
+                    data.append(_row_range(sheet_name, row, run, row_cells))
+                    run = []
+                run.append(col)
+            data.append(_row_range(sheet_name, row, run, row_cells))
+
+        if stamp:
+            data.append(stamp)
+        sh = self.spreadsheet()
+        self._write(sh.values_batch_update, {"valueInputOption": "RAW", "data": data})
+        if not stamp:
+            self._add_revision_row(sheet_name, token)
+        return previous, token
+
+
+def _row_range(sheet_name, row, cols, row_cells):
+    """Build one values batchUpdate entry for consecutive columns of a row."""
+    from gspread.utils import absolute_range_name, rowcol_to_a1
+
+    first = rowcol_to_a1(row, cols[0])
+    last = rowcol_to_a1(row, cols[-1])
+    return {
+        "range": absolute_range_name(sheet_name, f"{first}:{last}"),
+        "values": [[row_cells[col] for col in cols]],
+    }
+
+
+class SQLiteBackend(SheetBackend):
+    """Sheets stored in a local SQLite file, one table row per sheet row.
+
+    Reads never leave the box, so a sheet loads in milliseconds. Use
+    ``":memory:"`` as the path for a throwaway store in tests and benchmarks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheets (name TEXT PRIMARY KEY, pos INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_rows ("
+                " sheet TEXT, idx INTEGER, data TEXT, PRIMARY KEY (sheet, idx))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_revisions (sheet TEXT PRIMARY KEY, revision INTEGER)"
+            )
+
+    def list_sheets(self):
+        with self._lock:
+            cur = self._conn.execute("SELECT name FROM sheets ORDER BY pos")
+            return [name for (name,) in cur.fetchall()]
+
+    def describe_sheets(self):
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT s.name, s.pos, COUNT(r.idx), COALESCE(MAX(json_array_length(r.data)), 0) "
+                "FROM sheets s LEFT JOIN sheet_rows r ON r.sheet = s.name "
+                "GROUP BY s.name ORDER BY s.pos"
+            )
+            return [
+                {"title": name, "id": pos, "rows": rows, "cols": cols}
+                for name, pos, rows, cols in cur.fetchall()
+            ]
+
+    def read_sheets(self, sheet_names):
+        out = {}
+        with self._lock:
+            for name in sheet_names:
+                if not self._conn.execute("SELECT 1 FROM sheets WHERE name = ?", (name,)).fetchone():
+                    continue
+                cur = self._conn.execute(
+                    "SELECT data FROM sheet_rows WHERE sheet = ? ORDER BY idx", (name,)
+                )
+                out[name] = [json.loads(data) for (data,) in cur.fetchall()]
+        return out
+
+    def revisions(self, retry=True):
+        with self._lock:
+            cur = self._conn.execute("SELECT sheet, revision FROM sheet_revisions")
+            return {name: str(rev) for name, rev in cur.fetchall()}
+
+    def _revision(self, sheet_name):
+        found = self._conn.execute(
+            "SELECT revision FROM sheet_revisions WHERE sheet = ?", (sheet_name,)
+        ).fetchone()
+        return str(found[0]) if found else None
+
+    def _bump_revision(self, sheet_name):
+        self._conn.execute(
+            "INSERT INTO sheet_revisions (sheet, revision) VALUES (?, 1) "
+            "ON CONFLICT(sheet) DO UPDATE SET revision = revision + 1",
+            (sheet_name,),
+        )
+        return self._revision(sheet_name)
+
+    def _ensure_sheet(self, sheet_name):
+        self._conn.execute(
+            "INSERT OR IGNORE INTO sheets (name, pos) "
+            "VALUES (?, (SELECT COALESCE(MAX(pos), 0) + 1 FROM sheets))",
+            (sheet_name,),
+        )
+
+    def write_sheet(self, sheet_name, rows):
+        with self._lock, self._conn:
+            self._ensure_sheet(sheet_name)
+            self._conn.execute("DELETE FROM sheet_rows WHERE sheet = ?", (sheet_name,))
+            self._conn.executemany(
+                "INSERT INTO sheet_rows (sheet, idx, data) VALUES (?, ?, ?)",
+                ((sheet_name, i, json.dumps([str(v) for v in row])) for i, row in enumerate(rows)),
+            )
+            return self._bump_revision(sheet_name)
+
+    def _row_values(self, sheet_name, row):
+        found = self._conn.execute(
+            "SELECT data FROM sheet_rows WHERE sheet = ? AND idx = ?", (sheet_name, row - 1)
+        ).fetchone()
+        return json.loads(found[0]) if found else []
+
+    def update_cells(self, sheet_name, cells, expected=None):
+        """Check and write under one lock and transaction, so conflicts are exact."""
+        by_row = {}
+        for (row, col), value in cells.items():
+            by_row.setdefault(row, {})[col] = value
+        with self._lock, self._conn:
+            conflicts = [
+                row for row, checksum in (expected or {}).items()
+                if row_checksum(self._row_values(sheet_name, row)) != checksum
+            ]
+            if conflicts:
+                raise RowConflictError(sheet_name, conflicts)
+            previous = self._revision(sheet_name)
+            self._ensure_sheet(sheet_name)
+            for row, row_cells in by_row.items():
+                values = self._row_values(sheet_name, row)
+                width = max(len(values), max(row_cells))
+                values += [""] * (width - len(values))
+                for col, value in row_cells.items():
+                    values[col - 1] = str(value)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sheet_rows (sheet, idx, data) VALUES (?, ?, ?)",
+                    (sheet_name, row - 1, json.dumps(values)),
+                )
+            return previous, self._bump_revision(sheet_name)
+
+
+def copy_sheets(source, target, sheet_names=None):
+    """Copy sheets from one backend to another, e.g. to build a local mirror.
+
+    Copies every sheet of ``source`` when no names are given and returns the
+    list of sheets written.
+    """
+    names = list(sheet_names) if sheet_names is not None else source.list_sheets()
+    copied = []
+    for name, rows in source.read_sheets(names).items():
+        target.write_sheet(name, rows)
+        copied.append(name)
+    return copied
@@ -0,0 +1,174 @@
+"""Synthetic CentralAutomationDB workbooks for benchmarks and load tests.
+
+make_database() returns {sheet name: DataFrame} shaped like the real
+database: the eleven dashboard sheets, IO_<AREA>_<SHEET> worksheets and a
+MOPR sheet. Cells are all strings, with the blanks, "nan" placeholders,
+stray NBSP / zero-width characters and Unnamed columns that real Excel
+uploads bring along, so cleaning and export do their usual work. Sizes are
+configurable and the output depends only on the seed.
+
+    python synthetic_db.py synthetic.xlsx --rows 5000 --io-sheets 60
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# same sheets, same order as all_subsections in main.py
+DASHBOARD_SHEETS = [
+    "PLC DETAILS", "OS DETAILS", "SINGLE POINT TRIPPING", "PAIN POINT",
+    "IO LIST", "CRITICAL SPARES", "BACKUP", "PANEL EARTHING", "AUDIT", "INVENTORY", "DIRECTORY",
+]
+
+AREAS = [
+    "BF", "SMS", "CRM", "HSM", "RMPP-1", "RMPP-2", "SINTER", "COKE OVEN", "DRI 1&2",
+    "1000 TPD", "60 MW", "BRIGHT BAR ELECT", "OXYGEN PLANT", "WATER TREATMENT",
+]
+MAKES = ["SIEMENS", "ABB", "ALLEN BRADLEY", "SCHNEIDER", "YOKOGAWA", "HONEYWELL", "GE", "MITSUBISHI"]
+WORDS = [
+    "motor", "pump", "valve", "trip", "feedback", "conveyor", "fan", "blower", "cooling", "water",
+    "pressure", "temperature", "level", "flow", "drive", "panel", "module", "rack", "cpu", "power",
+    "supply", "interlock", "hydraulic", "lube", "oil", "gearbox", "crane", "ladle", "furnace", "stove",
+]
+DEPARTMENTS = [
+    "Blast Furnace", "Steel Melting Shop", "Cold Rolling Mill", "Hot Strip Mill", "Sinter Plant",
+    "Coke Oven", "Raw Material Handling", "Power Plant", "Oxygen Plant", "Water Management",
+    "Central Maintenance", "Instrumentation", "Electrical Services", "Automation", "Safety",
+    "Quality Assurance", "Logistics", "Stores", "Projects", "IT Infrastructure",
+]
+
+# columns of the sheets that exist in the real workbook; the rest get a
+# generic inventory-style layout
+_COLUMNS = {
+    "PLC DETAILS": [
+        "SL NO", "ITEM CODE", "AREA", "SUB AREA", "ITEM DESCRIPTION", "MAKE (OEM)",
+        "MODEL/PART NUMBER", "SPECIFICATION", "INSTALLED QTY", "AVAILABLE QTY",
+        "YEAR OF INSTALLATION", "UNIT PRICE", "TOTAL PRICE", "REMARKS", "Unnamed: 14",
+    ],
+    "OS DETAILS": ["SL NO", "AREA", "SUB AREA", "MAKE", "MODEL", "OS", "SOFTWARE INSTALLED", "QUANTITY"],
+    "SINGLE POINT TRIPPING": [
+        "SL.NO", "INSTRUMENT", "EQUIPMENT", "LOCATION", "AREA", "POSSIBILITY", "IMPACT", "REMARKS",
+    ],
+    "PAIN POINT": ["Sl No", "Equipment", "Area", "Description of issue", "Action plan task"],
+}
+_GENERIC_COLUMNS = ["SL NO", "AREA", "SUB AREA", "EQUIPMENT", "MAKE", "DESCRIPTION", "QTY", "STATUS", "REMARKS"]
+_IO_COLUMNS = ["TAG", "DESCRIPTION", "TYPE", "RACK", "SLOT", "CHANNEL", "SIGNAL", "REMARKS"]
+
+# sheets that are much shorter than PLC DETAILS in the real workbook
+_ROW_SHARE = {"PLC DETAILS": 1.0, "PAIN POINT": 0.01, "OS DETAILS": 0.05, "SINGLE POINT TRIPPING": 0.05}
+_DEFAULT_SHARE = 0.2
+
+
+def _text(rng, n, words=2, noise=0.02):
+    """``n`` random phrases; a few carry NBSP or zero-width characters."""
+    parts = rng.choice(WORDS, size=(n, words))
+    out = pd.Series([" ".join(row) for row in parts], dtype=object)
+    dirty = rng.random(n) < noise
+    out[dirty] = out[dirty].str.replace(" ", "\u00A0", n=1, regex=False) + "\u200B"
+    return out
+
+
+def _column(rng, name, n, area):
+    key = str(name).strip().upper()
+    if key.startswith("UNNAMED"):
+        return np.full(n, "", dtype=object)
+    if key in ("SL NO", "SL.NO"):
+        return np.arange(1, n + 1).astype(str).astype(object)
+    if key == "AREA":
+        return area
+    if key == "SUB AREA":
+        return np.char.add("UNIT-", rng.integers(1, 9, n).astype(str)).astype(object)
+    if key == "ITEM CODE":
+        return rng.integers(2_200_000_000, 2_299_999_999, n).astype(str).astype(object)
+    if key.startswith("MAKE"):
+        return rng.choice(MAKES, n).astype(object)
+    if key in ("INSTALLED QTY", "AVAILABLE QTY", "QTY", "QUANTITY"):
+        return rng.integers(0, 40, n).astype(str).astype(object)
+    if key == "YEAR OF INSTALLATION":
+        return rng.integers(1995, 2025, n).astype(str).astype(object)
+    if "PRICE" in key:
+        return np.round(rng.gamma(2.0, 15_000.0, n), 2).astype(str).astype(object)
+    if key in ("STATUS", "POSSIBILITY", "IMPACT"):
+        return rng.choice(["HIGH", "MEDIUM", "LOW", "OK", "nan"], n).astype(object)
+    if key.startswith("REMARKS"):
+        return np.where(rng.random(n) < 0.7, "", _text(rng, n, 3)).astype(object)
+    return _text(rng, n, 2 if "DESCRIPTION" not in key else 4).to_numpy()
+
+
+def make_sheet(columns, rows, rng, areas=AREAS):
+    """One sheet with ``columns`` and ``rows`` rows of plausible string data."""
+    area = rng.choice(areas, rows).astype(object)
+    return pd.DataFrame({col: _column(rng, col, rows, area) for col in columns})
+
+
+def make_io_sheet(area, rows, rng):
+    """One IO_<AREA>_<SHEET> worksheet: tags, descriptions and IO addresses."""
+    n = rows
+    return pd.DataFrame({
+        "TAG": [f"{area[:3]}-{i:05d}" for i in range(n)],
+        "DESCRIPTION": _text(rng, n, 3).to_numpy(),
+        "TYPE": rng.choice(["DI", "DO", "AI", "AO"], n).astype(object),
+        "RACK": rng.integers(0, 8, n).astype(str).astype(object),
+        "SLOT": rng.integers(1, 17, n).astype(str).astype(object),
+        "CHANNEL": rng.integers(0, 32, n).astype(str).astype(object),
+        "SIGNAL": rng.choice(["24VDC", "4-20mA", "PT100", "230VAC"], n).astype(object),
+        "REMARKS": np.where(rng.random(n) < 0.8, "", "spare").astype(object),
+    }, columns=_IO_COLUMNS)
+
+
+def make_mopr_sheet(rows, rng, departments=DEPARTMENTS):
+    """MOPR sheet: Department, PPT link (HYPERLINK formulas, plain URLs or
+    blank) and a date over the last three financial years."""
+    n = rows
+    dept = rng.choice(departments, n).astype(object)
+    doc = rng.integers(10_000, 99_999, n).astype(str)
+    kind = rng.random(n)
+    url = np.where(
+        kind < 0.5, np.char.add(np.char.add('=HYPERLINK("https://docs.example.com/ppt/', doc), '","PPT")'),
+        np.where(kind < 0.9, np.char.add("https://docs.example.com/ppt/", doc), ""),
+    ).astype(object)
+    dates = pd.Timestamp("2022-04-01") + pd.to_timedelta(rng.integers(0, 3 * 365, n), unit="D")
+    return pd.DataFrame({"Department": dept, "PPT_URL": url, "Date": dates.strftime("%Y-%m-%d").to_numpy()})
+
+
+def make_database(rows=2500, io_sheets=40, io_rows=400, mopr_rows=240, seed=0):
+    """{sheet name: DataFrame} for a whole synthetic database.
+
+    ``rows`` sizes the largest dashboard sheet (PLC DETAILS); the others
+    are scaled down roughly as in the real workbook.
+    """
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for name in DASHBOARD_SHEETS:
+        n = max(5, int(rows * _ROW_SHARE.get(name, _DEFAULT_SHARE)))
+        frames[name] = make_sheet(_COLUMNS.get(name, _GENERIC_COLUMNS), n, rng)
+    for i in range(io_sheets):
+        area = AREAS[i % len(AREAS)]
+        frames[f"IO_{area}_PLC{i // len(AREAS) + 1}"] = make_io_sheet(area, io_rows, rng)
+    frames["MOPR"] = make_mopr_sheet(mopr_rows, rng)
+    return frames
+
+
+def write_workbook(frames, path):
+    """Write ``frames`` to an .xlsx workbook, one worksheet per sheet."""
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for name, df in frames.items():
+            df.to_excel(writer, sheet_name=name[:31], index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic CentralAutomationDB workbook.")
+    parser.add_argument("path", help="output .xlsx file")
+    parser.add_argument("--rows", type=int, default=2500, help="rows of the largest dashboard sheet")
+    parser.add_argument("--io-sheets", type=int, default=40)
+    parser.add_argument("--io-rows", type=int, default=400)
+    parser.add_argument("--mopr-rows", type=int, default=240)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    frames = make_database(args.rows, args.io_sheets, args.io_rows, args.mopr_rows, args.seed)
+    write_workbook(frames, args.path)
+    print(f"wrote {len(frames)} sheets, {sum(len(df) for df in frames.values())} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()